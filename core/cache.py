@@ -0,0 +1,58 @@
+import time
+
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+
+GENERATION_KEY = 'gen:{family}'
+# Twice the longest entry timeout (a day): a counter that expires only takes
+# entries with it that are long gone, and families nobody writes to (say,
+# availability for a far-off date nobody books) do not pile up in Redis.
+GENERATION_TIMEOUT = 2 * 60 * 60 * 24
+
+
+def _initial_generation():
+    # Seeding from the clock means a counter that was evicted never restarts
+    # at a value that older, still-live entries were written under.
+    return int(time.time() * 1000)
+
+
+def get_generations(families):
+    """
+    Current generation of each family, fetched in a single round trip.
+
+    A family without a counter is at generation 0; only a bump creates one,
+    so reads never write to Redis.
+    """
+    keys = [GENERATION_KEY.format(family=family) for family in families]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def get_generation(family):
+    return get_generations([family])[0]
+
+
+def versioned_key(family, params=None, tags=()):
+    """
+    Build a cache key for ``family`` with its current generation baked in.
+
+    ``params`` (a mapping of query parameters) distinguishes entries inside
+    the family; entries written under an older generation are never read
+    again and simply expire. ``tags`` are extra families the entry depends
+    on: bumping any of them invalidates it as well.
+    """
+    version = '.'.join(str(generation) for generation in get_generations([family, *tags]))
+    suffix = urlencode(sorted(params.items())) if params else 'all'
+    return f'{family}:v{version}:{suffix}'
+
+
+def bump_generation(*families):
+    """Invalidate every key of the given families in O(1) per family."""
+    for family in families:
+        key = GENERATION_KEY.format(family=family)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, _initial_generation(), timeout=GENERATION_TIMEOUT):
+                cache.incr(key)
@@ -14,12 +14,28 @@ def debug_task(self):
 from celery.schedules import crontab
 
 app.conf.beat_schedule = {
-    'send-reservation-reminders-daily': {
+    'send-reservation-reminders-hourly': {
         'task': 'reservations.tasks.send_reservation_reminders',
-        'schedule': crontab(hour=8, minute=0),
+        'schedule': crontab(hour='8-20', minute=0),
     },
-    'mark-no-shows-daily': {
+    'forecast-demand-daily': {
+        'task': 'restaurants.tasks.forecast_demand',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'mark-no-shows-hourly': {
         'task': 'reservations.tasks.mark_no_shows',
-        'schedule': crontab(hour=23, minute=30),
+        'schedule': crontab(minute=5),
+    },
+    'ensure-reservation-partitions-daily': {
+        'task': 'reservations.tasks.ensure_reservation_partitions',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'repair-restaurant-ratings-nightly': {
+        'task': 'restaurants.tasks.repair_restaurant_ratings',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'archive-reservations-monthly': {
+        'task': 'reservations.tasks.archive_reservations',
+        'schedule': crontab(day_of_month=1, hour=3, minute=30),
     },
 }
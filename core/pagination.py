@@ -0,0 +1,215 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination.
+
+    The cursor carries the sort values of the last row on the page, so the
+    next page is a range scan on the ordering index no matter how deep the
+    client has paged. Every ordering ends with ``id`` as a tie-breaker so
+    rows sharing a sort value are never skipped or repeated.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering = ('-id',)
+    orderings = {}
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request):
+        return self.orderings.get(
+            request.query_params.get(self.ordering_query_param),
+            self.ordering
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+        self.current_ordering = self.get_ordering(request)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.current_ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position))
+
+        rows = list(queryset[:self.current_page_size + 1])
+        self.has_next = len(rows) > self.current_page_size
+        page = rows[:self.current_page_size]
+        self.next_position = self.get_position(page[-1]) if self.has_next else None
+        return page
+
+    def position_filter(self, position):
+        # (a, b, id) > (x, y, z) expanded into OR-ed prefixes so each
+        # column keeps its own sort direction.
+        condition = Q()
+        for index, field in enumerate(self.current_ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.current_ordering[:index], position):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.current_ordering:
+            value = getattr(instance, field.lstrip('-'))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.current_ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Typed by the ordering fields, so a tampered value is a 404 here
+        # instead of an error from the lookup.
+        fields = [self.model._meta.get_field(field.lstrip('-')) for field in self.current_ordering]
+        try:
+            position = [field.to_python(value) for field, value in zip(fields, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pagination cursor taken from the "next" link',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class RestaurantPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    orderings = {
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+        'average_rating': ('average_rating', 'id'),
+        '-average_rating': ('-average_rating', '-id'),
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+    }
+
+
+class RatingPagination(KeysetPagination):
+    ordering = ('-average_rating', '-id')
+
+
+class DishPagination(KeysetPagination):
+    ordering = ('name', 'id')
+    orderings = {
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+    }
+
+
+class TablePagination(KeysetPagination):
+    ordering = ('restaurant_id', 'table_number', 'id')
+
+
+class ReservationPagination(KeysetPagination):
+    ordering = ('-date', '-time_slot', '-id')
+    orderings = {
+        'date': ('date', 'time_slot', 'id'),
+        '-date': ('-date', '-time_slot', '-id'),
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+    }
+
+
+class ReviewFeedPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    
+    def is_first_page(self, request):
+        """Whether ``request`` asks for the default first page, the one that is cached."""
+        return (
+            not request.query_params.get(self.cursor_query_param)
+            and self.get_page_size(request) == self.page_size
+        )
+    
+    def paginate_cached(self, request, page):
+        """Take a cached first page (see ``reviews.feed``) instead of querying."""
+        self.request = request
+        entries = page['entries']
+        self.has_next = page['has_next'] and bool(entries)
+        self.next_position = entries[-1]['position'] if self.has_next else None
+        return [entry['data'] for entry in entries]
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
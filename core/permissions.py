@@ -41,10 +41,10 @@ class IsReservationParticipant(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         user = request.user
         
-        if obj.user == user:
+        if obj.user_id == user.id:
             return True
         
-        if obj.restaurant.owner == user:
+        if obj.restaurant.owner_id == user.id:
             return True
         
         if user.is_admin_user:
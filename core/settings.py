@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     
     # Third party apps
     "rest_framework",
@@ -103,6 +104,8 @@ DATABASES = {
         "CONN_MAX_AGE": 600,  # Connection pooling
         "OPTIONS": {
             "connect_timeout": 10,
+            # Lower than the 0.6 default so autocomplete tolerates typos
+            "options": "-c pg_trgm.word_similarity_threshold=0.5",
         }
     }
 }
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Reservation, ReservationStatus
+from .models import (
+    Reservation, ReservationArchive, ReservationStatus, DailyOccupancy, Waitlist, transition_sources
+)
 
 
 @admin.register(Reservation)
@@ -13,7 +15,7 @@ class ReservationAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Reservation Details', {
-            'fields': ('user', 'restaurant', 'table', 'date', 'time_slot', 'guests_count')
+            'fields': ('user', 'restaurant', 'table', 'date', 'time_slot', 'duration', 'guests_count')
         }),
         ('Status', {
             'fields': ('status',)
@@ -32,12 +34,48 @@ class ReservationAdmin(admin.ModelAdmin):
     actions = ['confirm_reservations', 'cancel_reservations']
     
     def confirm_reservations(self, request, queryset):
-        updated = queryset.update(status=ReservationStatus.CONFIRMED)
+        # transition() keeps caches and occupancy in step with the change.
+        updated = sum(reservation.confirm() for reservation in queryset.filter(
+            status__in=transition_sources(ReservationStatus.CONFIRMED)
+        ))
         self.message_user(request, f'{updated} reservations confirmed.')
     confirm_reservations.short_description = 'Confirm selected reservations'
     
     def cancel_reservations(self, request, queryset):
-        updated = queryset.update(status=ReservationStatus.CANCELLED)
+        updated = sum(reservation.cancel() for reservation in queryset.filter(
+            status__in=transition_sources(ReservationStatus.CANCELLED)
+        ))
         self.message_user(request, f'{updated} reservations cancelled.')
     cancel_reservations.short_description = 'Cancel selected reservations'
 
+
+
+@admin.register(Waitlist)
+class WaitlistAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'restaurant', 'date', 'time_slot', 'guests_count', 'priority', 'status', 'created_at']
+    list_filter = ['status', 'date', 'restaurant']
+    search_fields = ['user__email', 'restaurant__name']
+    readonly_fields = ['reservation', 'created_at', 'updated_at']
+    date_hierarchy = 'date'
+
+
+@admin.register(DailyOccupancy)
+class DailyOccupancyAdmin(admin.ModelAdmin):
+    list_display = ['id', 'restaurant', 'date', 'updated_at']
+    list_filter = ['date', 'restaurant']
+    readonly_fields = ['restaurant', 'date', 'tables', 'updated_at']
+    date_hierarchy = 'date'
+
+
+@admin.register(ReservationArchive)
+class ReservationArchiveAdmin(admin.ModelAdmin):
+    list_display = ['id', 'restaurant', 'user', 'date', 'time_slot', 'guests_count', 'status', 'archived_at']
+    list_filter = ['status', 'date']
+    search_fields = ['user__email', 'restaurant__name']
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,9 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ReservationConflict(APIException):
+    """The table is already taken for an overlapping period."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This table is already reserved for this time slot'
+    default_code = 'reservation_conflict'
@@ -0,0 +1,37 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_FIELDS = [
+    'id', 'date', 'time_slot', 'duration', 'guests_count', 'status',
+    'restaurant_id', 'restaurant__name', 'table__table_number',
+    'user__email', 'user__first_name', 'user__last_name',
+    'special_requests', 'created_at',
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    # values() skips model instantiation and iterator() reads through a
+    # server-side cursor, so memory stays flat however long the history is.
+    return queryset.values(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def ndjson_lines(queryset):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in export_rows(queryset):
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(queryset):
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
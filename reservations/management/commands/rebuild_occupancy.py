@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from restaurants.models import Restaurant
+from reservations.occupancy import rebuild_day
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily occupancy bitmaps from reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, action='append', help='Restaurant id (repeatable); all by default')
+        parser.add_argument('--date-from', type=date.fromisoformat, help='First day, YYYY-MM-DD; today by default')
+        parser.add_argument('--date-to', type=date.fromisoformat, help='Last day, YYYY-MM-DD; 60 days ahead by default')
+
+    def handle(self, *args, **options):
+        date_from = options['date_from'] or timezone.localdate()
+        date_to = options['date_to'] or date_from + timedelta(days=60)
+        if date_to < date_from:
+            raise CommandError('--date-to must not be before --date-from')
+
+        restaurants = Restaurant.objects.order_by('id')
+        if options['restaurant']:
+            restaurants = restaurants.filter(pk__in=options['restaurant'])
+
+        days = (date_to - date_from).days + 1
+        rebuilt = 0
+        for restaurant_id in restaurants.values_list('id', flat=True).iterator():
+            for offset in range(days):
+                rebuild_day(restaurant_id, date_from + timedelta(days=offset))
+                rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} restaurant-days'))
@@ -0,0 +1,110 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:14
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.core.validators
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def populate_period(apps, schema_editor):
+    schema_editor.execute(
+        "UPDATE reservations_reservation AS r "
+        "SET duration = rs.reservation_duration "
+        "FROM restaurants_restaurant AS rs "
+        "WHERE rs.id = r.restaurant_id AND r.duration IS NULL"
+    )
+    # Only bookings that can still collide get a period: stale past rows
+    # left in an active status must not block the constraint below.
+    schema_editor.execute(
+        "UPDATE reservations_reservation "
+        "SET period = tstzrange("
+        "(date + time_slot) AT TIME ZONE %s, "
+        "(date + time_slot) AT TIME ZONE %s + make_interval(mins => duration)"
+        ") WHERE date >= CURRENT_DATE - 1",
+        params=[settings.TIME_ZONE, settings.TIME_ZONE]
+    )
+    # Flush deferred FK checks queued by the updates before ALTER TABLE.
+    schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+def release_overlaps(apps, schema_editor):
+    """
+    Clear ``period`` on active bookings that overlap an earlier one.
+
+    The old exact-time check let through bookings of the same table that
+    overlap without starting at the same minute; the constraint below would
+    refuse to build on them. The earliest booking (by id) keeps the table,
+    the later ones stay as they are but without a period, so staff can see
+    and move them.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, table_id, lower(period), upper(period) "
+            "FROM reservations_reservation "
+            "WHERE period IS NOT NULL AND status IN ('pending', 'confirmed', 'seated') "
+            "ORDER BY id"
+        )
+        kept = {}
+        released = []
+        for pk, table_id, start, end in cursor.fetchall():
+            taken = kept.setdefault(table_id, [])
+            if any(start < taken_end and taken_start < end for taken_start, taken_end in taken):
+                released.append(pk)
+            else:
+                taken.append((start, end))
+        if released:
+            cursor.execute(
+                "UPDATE reservations_reservation SET period = NULL WHERE id = ANY(%s)",
+                [released]
+            )
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0003_initial"),
+        ("restaurants", "0007_reservation_duration"),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name="reservation",
+            name="duration",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Seating length in minutes, defaults to the restaurant setting",
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(15),
+                    django.core.validators.MaxValueValidator(720),
+                ],
+                verbose_name="duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="period",
+            field=django.contrib.postgres.fields.ranges.DateTimeRangeField(
+                blank=True,
+                editable=False,
+                help_text="Time range the table is occupied, derived from date, time and duration",
+                null=True,
+                verbose_name="period",
+            ),
+        ),
+        migrations.RunPython(populate_period, migrations.RunPython.noop),
+        migrations.RunPython(release_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="reservation",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status__in", ["pending", "confirmed", "seated"])),
+                expressions=[("table", "="), ("period", "&&")],
+                name="reservation_table_no_overlap",
+                violation_error_message="This table is already reserved for this time slot",
+            ),
+        ),
+    ]
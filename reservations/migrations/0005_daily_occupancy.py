@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0004_reservation_period"),
+        ("restaurants", "0007_reservation_duration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(
+                        help_text="Local date the slots belong to", verbose_name="date"
+                    ),
+                ),
+                (
+                    "tables",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Table id -> bitmask of booked slots",
+                        verbose_name="tables",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        help_text="Restaurant",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occupancy",
+                        to="restaurants.restaurant",
+                        verbose_name="restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "daily occupancy",
+                "verbose_name_plural": "daily occupancy",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyoccupancy",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "date"), name="daily_occupancy_restaurant_date"
+            ),
+        ),
+    ]
@@ -0,0 +1,156 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:22
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0005_daily_occupancy"),
+        ("restaurants", "0007_reservation_duration"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Waitlist",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(help_text="Requested date", verbose_name="date"),
+                ),
+                (
+                    "time_slot",
+                    models.TimeField(help_text="Requested time", verbose_name="time"),
+                ),
+                (
+                    "guests_count",
+                    models.PositiveSmallIntegerField(
+                        help_text="Number of guests",
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(20),
+                        ],
+                        verbose_name="guests count",
+                    ),
+                ),
+                (
+                    "duration",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text="Seating length in minutes, defaults to the restaurant setting",
+                        null=True,
+                        validators=[
+                            django.core.validators.MinValueValidator(15),
+                            django.core.validators.MaxValueValidator(720),
+                        ],
+                        verbose_name="duration",
+                    ),
+                ),
+                (
+                    "priority",
+                    models.SmallIntegerField(
+                        default=0,
+                        help_text="Higher priority is promoted first",
+                        verbose_name="priority",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("waiting", "В листе ожидания"),
+                            ("promoted", "Бронь создана"),
+                            ("cancelled", "Отменено"),
+                        ],
+                        default="waiting",
+                        help_text="Waitlist entry status",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                (
+                    "reservation",
+                    models.OneToOneField(
+                        blank=True,
+                        help_text="Reservation created on promotion",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="waitlist_entry",
+                        to="reservations.reservation",
+                        verbose_name="reservation",
+                    ),
+                ),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        help_text="Restaurant",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to="restaurants.restaurant",
+                        verbose_name="restaurant",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="Guest waiting for a table",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "waitlist entry",
+                "verbose_name_plural": "waitlist",
+                "ordering": ["date", "time_slot", "-priority", "created_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "waiting")),
+                        fields=[
+                            "restaurant",
+                            "date",
+                            "time_slot",
+                            "-priority",
+                            "-guests_count",
+                            "created_at",
+                        ],
+                        name="waitlist_queue",
+                    ),
+                    models.Index(
+                        fields=["user"], name="reservation_user_id_d273a8_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="waitlist",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "waiting")),
+                fields=("user", "restaurant", "date", "time_slot"),
+                name="waitlist_one_entry_per_slot",
+            ),
+        ),
+    ]
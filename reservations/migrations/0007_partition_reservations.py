@@ -0,0 +1,316 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:27
+
+from datetime import date
+
+import django.contrib.postgres.fields.ranges
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copies of reservations.partitions as of this migration, so later
+# edits to that module do not change what it does.
+TABLE = 'reservations_reservation'
+OLD_TABLE = f'{TABLE}_unpartitioned'
+PARTITIONED_TABLE = f'{TABLE}_partitioned'
+PARTITION_MONTHS_AHEAD = 12
+OVERLAP_CONSTRAINT = 'reservation_table_no_overlap'
+ACTIVE_STATUSES = ['pending', 'confirmed', 'seated']
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def add_overlap_constraint(cursor, partition, suffix):
+    statuses = ', '.join(f"'{status}'" for status in ACTIVE_STATUSES)
+    cursor.execute(
+        f'ALTER TABLE {partition} ADD CONSTRAINT {OVERLAP_CONSTRAINT}_{suffix} '
+        f'EXCLUDE USING gist (table_id WITH =, period WITH &&) '
+        f'WHERE (status IN ({statuses}))'
+    )
+
+
+def secondary_indexes(cursor, table):
+    """Names and definitions of the indexes of ``table`` not backing a constraint."""
+    cursor.execute(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = %s AND indexname NOT IN (
+            SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass
+        )
+        """,
+        [table, table]
+    )
+    return cursor.fetchall()
+
+
+def foreign_keys(cursor, table):
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table]
+    )
+    return cursor.fetchall()
+
+
+def recreate_indexes(cursor, indexes, source):
+    for _, definition in indexes:
+        definition = definition.replace(f' ON ONLY public.{source} ', f' ON public.{TABLE} ')
+        cursor.execute(definition.replace(f' ON public.{source} ', f' ON public.{TABLE} '))
+
+
+def partition_reservations(apps, schema_editor):
+    """
+    Rebuild the reservations table as ``PARTITION BY RANGE (date)`` with one
+    partition per month, copying the rows over.
+
+    The primary key becomes (id, date) since a partitioned table's unique
+    keys must contain the partition key; ids keep coming from a sequence.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+        cursor.execute(f'ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT {TABLE}_pkey TO {OLD_TABLE}_pkey')
+
+        # Secondary indexes are recreated under their names on the new table.
+        indexes = secondary_indexes(cursor, OLD_TABLE)
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+        keys = foreign_keys(cursor, OLD_TABLE)
+
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (date)'
+        )
+        cursor.execute(f'CREATE SEQUENCE {TABLE}_id_partitioned_seq OWNED BY {TABLE}.id')
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_partitioned_seq')")
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, date)')
+        for name, definition in keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+        cursor.execute(f'SELECT min(date) FROM {OLD_TABLE}')
+        this_month = date.today().replace(day=1)
+        month = min(filter(None, [cursor.fetchone()[0], this_month])).replace(day=1)
+        last = add_months(this_month, PARTITION_MONTHS_AHEAD)
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+        add_overlap_constraint(cursor, f'{TABLE}_default', 'default')
+        while month <= last:
+            suffix = f'{month.year}_{month.month:02d}'
+            cursor.execute(
+                f'CREATE TABLE {TABLE}_{suffix} PARTITION OF {TABLE} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+            add_overlap_constraint(cursor, f'{TABLE}_{suffix}', suffix)
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}')
+        # Deferred foreign key checks must fire before further DDL.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(
+            f"SELECT setval('{TABLE}_id_partitioned_seq', "
+            f"(SELECT coalesce(max(id), 0) + 1 FROM {TABLE}), false)"
+        )
+        recreate_indexes(cursor, indexes, OLD_TABLE)
+
+        cursor.execute(f'DROP TABLE {OLD_TABLE}')
+
+
+def unpartition_reservations(apps, schema_editor):
+    """
+    Put the rows back into a plain table keyed by ``id`` alone.
+
+    The partitions' overlap constraints go with them; reversing the
+    ``RemoveConstraint`` above adds the single table-wide one back.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {PARTITIONED_TABLE}')
+        cursor.execute(
+            f'ALTER TABLE {PARTITIONED_TABLE} RENAME CONSTRAINT {TABLE}_pkey TO {PARTITIONED_TABLE}_pkey'
+        )
+
+        indexes = secondary_indexes(cursor, PARTITIONED_TABLE)
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+        keys = foreign_keys(cursor, PARTITIONED_TABLE)
+
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {PARTITIONED_TABLE} INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)')
+        for name, definition in keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {PARTITIONED_TABLE}')
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"(SELECT coalesce(max(id), 0) + 1 FROM {TABLE}), false)"
+        )
+        recreate_indexes(cursor, indexes, PARTITIONED_TABLE)
+
+        # Drops the partitions and the id sequence owned by the old table.
+        cursor.execute(f'DROP TABLE {PARTITIONED_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0006_waitlist"),
+        ("restaurants", "0008_demand_forecast"),
+        ("reviews", "0003_reservation_without_db_constraint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReservationArchive",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "date",
+                    models.DateField(help_text="Reservation date", verbose_name="date"),
+                ),
+                (
+                    "time_slot",
+                    models.TimeField(help_text="Reservation time", verbose_name="time"),
+                ),
+                (
+                    "duration",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text="Seating length in minutes",
+                        null=True,
+                        verbose_name="duration",
+                    ),
+                ),
+                (
+                    "period",
+                    django.contrib.postgres.fields.ranges.DateTimeRangeField(
+                        blank=True,
+                        help_text="Time range the table was occupied",
+                        null=True,
+                        verbose_name="period",
+                    ),
+                ),
+                (
+                    "guests_count",
+                    models.PositiveSmallIntegerField(
+                        help_text="Number of guests", verbose_name="guests count"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает подтверждения"),
+                            ("confirmed", "Подтверждено"),
+                            ("seated", "Гость за столом"),
+                            ("completed", "Завершено"),
+                            ("cancelled", "Отменено"),
+                            ("no_show", "Гость не пришёл"),
+                        ],
+                        help_text="Final reservation status",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "special_requests",
+                    models.TextField(blank=True, verbose_name="special requests"),
+                ),
+                (
+                    "confirmation_sent",
+                    models.BooleanField(
+                        default=False, verbose_name="confirmation sent"
+                    ),
+                ),
+                (
+                    "reminder_sent",
+                    models.BooleanField(default=False, verbose_name="reminder sent"),
+                ),
+                ("created_at", models.DateTimeField(verbose_name="created at")),
+                ("updated_at", models.DateTimeField(verbose_name="updated at")),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        help_text="When the row was moved to the archive",
+                        verbose_name="archived at",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "archived reservation",
+                "verbose_name_plural": "archived reservations",
+                "ordering": ["-date", "-time_slot"],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name="reservation",
+            name="reservation_table_no_overlap",
+        ),
+        migrations.AlterField(
+            model_name="waitlist",
+            name="reservation",
+            field=models.OneToOneField(
+                blank=True,
+                db_constraint=False,
+                help_text="Reservation created on promotion",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="waitlist_entry",
+                to="reservations.reservation",
+                verbose_name="reservation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservationarchive",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_constraint=False,
+                help_text="Restaurant for reservation",
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="archived_reservations",
+                to="restaurants.restaurant",
+                verbose_name="restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservationarchive",
+            name="table",
+            field=models.ForeignKey(
+                db_constraint=False,
+                help_text="Reserved table",
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="archived_reservations",
+                to="restaurants.table",
+                verbose_name="table",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservationarchive",
+            name="user",
+            field=models.ForeignKey(
+                db_constraint=False,
+                help_text="User who made the reservation",
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="archived_reservations",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="user",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservationarchive",
+            index=models.Index(
+                fields=["restaurant", "date"], name="reservation_restaur_fb3969_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservationarchive",
+            index=models.Index(fields=["user"], name="reservation_user_id_a35c87_idx"),
+        ),
+        migrations.RunPython(partition_reservations, unpartition_reservations),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0007_partition_reservations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="reminder_claimed_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When a reminder worker took the row; reclaimable once stale",
+                null=True,
+                verbose_name="reminder claimed at",
+            ),
+        ),
+    ]
@@ -1,9 +1,17 @@
-from django.db import models
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from core.cache import bump_generation
+
 
 class ReservationStatus(models.TextChoices):
     PENDING = 'pending', 'Ожидает подтверждения'
@@ -14,6 +22,108 @@ class ReservationStatus(models.TextChoices):
     NO_SHOW = 'no_show', 'Гость не пришёл'
 
 
+ACTIVE_STATUSES = [
+    ReservationStatus.PENDING,
+    ReservationStatus.CONFIRMED,
+    ReservationStatus.SEATED,
+]
+
+
+# Target statuses reachable from each status; anything missing is final.
+ALLOWED_TRANSITIONS = {
+    ReservationStatus.PENDING: [ReservationStatus.CONFIRMED, ReservationStatus.CANCELLED],
+    ReservationStatus.CONFIRMED: [ReservationStatus.SEATED, ReservationStatus.CANCELLED, ReservationStatus.NO_SHOW],
+    ReservationStatus.SEATED: [ReservationStatus.COMPLETED, ReservationStatus.CANCELLED],
+}
+
+
+def transition_sources(status):
+    """Statuses from which a reservation may move to ``status``."""
+    return [source for source, targets in ALLOWED_TRANSITIONS.items() if status in targets]
+
+
+# Releasing a table this way offers it to the waitlist.
+WAITLIST_TRIGGER_STATUSES = [ReservationStatus.CANCELLED, ReservationStatus.NO_SHOW]
+
+OVERLAP_CONSTRAINT = 'reservation_table_no_overlap'
+
+
+class ReservationOverlapError(ValidationError):
+    """The table already has an active booking overlapping the requested period."""
+
+
+def is_overlap_violation(exc):
+    """Whether an ``IntegrityError`` comes from a partition's table overlap constraint."""
+    diag = getattr(exc.__cause__, 'diag', None)
+    return (getattr(diag, 'constraint_name', None) or '').startswith(OVERLAP_CONSTRAINT)
+
+
+def touches_month_boundary(period):
+    """
+    Whether ``period`` could overlap a booking in another month's partition:
+    it runs into the next month, or starts early enough on the 1st for a
+    seating from the last day of the previous month (at most 12 hours) to
+    still be going on.
+    """
+    start = timezone.localtime(period.lower)
+    end = timezone.localtime(period.upper - timedelta(microseconds=1))
+    return (start.year, start.month) != (end.year, end.month) or (start.day == 1 and start.hour < 12)
+
+
+def guard_month_boundary(bookings, exclude=None):
+    """
+    Reject overlaps across a month boundary, which no exclusion constraint sees.
+
+    Each monthly partition carries its own constraint, so a seating running
+    past midnight into the next month is never checked against that month's
+    bookings. For the ``(table_id, period)`` bookings touching a boundary
+    the tables are locked (every such booking on a table takes the same
+    lock) and active bookings from the day before to the day after are
+    checked; the rest is left to the constraint. Call it inside the
+    transaction that writes the bookings, before writing them.
+    """
+    from restaurants.models import Table
+    
+    bookings = [(table_id, period) for table_id, period in bookings if touches_month_boundary(period)]
+    if not bookings:
+        return
+    
+    list(Table.objects.select_for_update().filter(
+        pk__in={table_id for table_id, _ in bookings}
+    ).order_by('pk').values_list('pk', flat=True))
+    
+    days = [timezone.localtime(period.lower).date() for _, period in bookings]
+    overlapping = Reservation.objects.filter(
+        reduce(or_, (
+            models.Q(table_id=table_id, period__overlap=period)
+            for table_id, period in bookings
+        )),
+        date__range=(min(days) - timedelta(days=1), max(days) + timedelta(days=1)),
+        status__in=ACTIVE_STATUSES
+    )
+    if exclude is not None:
+        overlapping = overlapping.exclude(pk=exclude)
+    if overlapping.exists():
+        raise ReservationOverlapError('This table is already reserved for this time slot')
+
+
+def reservation_period(date, time_slot, duration):
+    """Half-open ``[start, end)`` range a seating occupies its table."""
+    start = timezone.make_aware(datetime.combine(date, time_slot))
+    return DateTimeTZRange(start, start + timedelta(minutes=duration))
+
+
+def reservation_day_family(restaurant_id, date):
+    """Cache family for everything derived from a restaurant's bookings on ``date``."""
+    return f'reservations:{restaurant_id}:{date}'
+
+
+def reservation_days_changed(restaurant_id, dates):
+    """Invalidate per-day caches once the surrounding transaction commits."""
+    families = [reservation_day_family(restaurant_id, date) for date in set(dates) if date]
+    transaction.on_commit(lambda: bump_generation(*families))
+
+
 class Reservation(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -50,6 +160,20 @@ class Reservation(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(20)],
         help_text='Number of guests'
     )
+    duration = models.PositiveSmallIntegerField(
+        'duration',
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(15), MaxValueValidator(720)],
+        help_text='Seating length in minutes, defaults to the restaurant setting'
+    )
+    period = DateTimeRangeField(
+        'period',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Time range the table is occupied, derived from date, time and duration'
+    )
     
     status = models.CharField(
         'status',
@@ -75,6 +199,13 @@ class Reservation(models.Model):
         default=False,
         help_text='Was reminder email sent'
     )
+    reminder_claimed_at = models.DateTimeField(
+        'reminder claimed at',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='When a reminder worker took the row; reclaimable once stale'
+    )
     
     created_at = models.DateTimeField('created at', auto_now_add=True)
     updated_at = models.DateTimeField('updated at', auto_now=True)
@@ -92,10 +223,23 @@ class Reservation(models.Model):
             models.Index(fields=['date', 'time_slot']),
             models.Index(fields=['created_at']),
         ]
+        # The table is range-partitioned by month on ``date`` (see
+        # ``reservations.partitions``); the (table, period) overlap
+        # exclusion constraint lives on each partition, as Postgres cannot
+        # declare it on the partitioned parent.
     
     def __str__(self):
         return f"{self.restaurant.name} - {self.date} {self.time_slot} - {self.user.email}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored position so moving a booking invalidates and
+        # re-derives occupancy for the old place as well as the new one.
+        instance._loaded_date = instance.__dict__.get('date')
+        instance._loaded_booking = (instance.__dict__.get('table_id'), instance.__dict__.get('period'))
+        return instance
+    
     def clean(self):
         errors = {}
         
@@ -127,47 +271,106 @@ class Reservation(models.Model):
         if hasattr(self, 'restaurant') and not self.restaurant.is_active:
             errors['restaurant'] = 'This restaurant is not accepting reservations'
         
-        if (self.date and self.time_slot and hasattr(self, 'table')):
-            conflicting = Reservation.objects.filter(
-                table=self.table,
-                date=self.date,
-                time_slot=self.time_slot,
-                status__in=[
-                    ReservationStatus.PENDING,
-                    ReservationStatus.CONFIRMED,
-                    ReservationStatus.SEATED
-                ]
-            ).exclude(pk=self.pk)
-            
-            if conflicting.exists():
-                errors['__all__'] = 'This table is already reserved for this time slot'
-        
         if errors:
             raise ValidationError(errors)
     
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        from .occupancy import refresh_occupancy
+        
+        if not self.duration:
+            self.duration = self.restaurant.reservation_duration
+        self.period = reservation_period(self.date, self.time_slot, self.duration)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'time_slot', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'period'}
+        
+        # Overlaps are left to the exclusion constraint instead of a
+        # SELECT beforehand, which could race with a concurrent insert;
+        # only month boundaries need a locked check of their own.
+        self.full_clean(validate_constraints=False)
+        try:
+            with transaction.atomic():
+                guard_month_boundary([(self.table_id, self.period)], exclude=self.pk)
+                super().save(*args, **kwargs)
+                refresh_occupancy(self.restaurant_id, [
+                    (self.table_id, self.period),
+                    getattr(self, '_loaded_booking', (None, None)),
+                ])
+        except IntegrityError as exc:
+            if is_overlap_violation(exc):
+                raise ReservationOverlapError(
+                    'This table is already reserved for this time slot'
+                ) from exc
+            raise
+        
+        reservation_days_changed(
+            self.restaurant_id,
+            [
+                self.date,
+                timezone.localtime(self.period.upper).date(),
+                getattr(self, '_loaded_date', None),
+            ]
+        )
+        self._loaded_date = self.date
+        self._loaded_booking = (self.table_id, self.period)
+    
+    def can_transition(self, status):
+        return status in ALLOWED_TRANSITIONS.get(self.status, [])
+    
+    def transition(self, status):
+        """
+        Move to ``status`` with a single compare-and-set UPDATE.
+
+        The row only changes if its stored status still allows the move, so
+        concurrent hosts cannot overwrite each other; returns whether it did.
+        Status changes never need full_clean: the date may be in the past by
+        now and no transition can create a table overlap.
+        """
+        from reviews.models import ReviewEligibility
+        from .occupancy import refresh_occupancy
+        from .tasks import queue_promotion
+        
+        now = timezone.now()
+        with transaction.atomic():
+            # ``date`` lets the UPDATE touch a single partition.
+            updated = Reservation.objects.filter(
+                pk=self.pk,
+                date=self.date,
+                status__in=transition_sources(status)
+            ).update(status=status, updated_at=now)
+            if updated and status not in ACTIVE_STATUSES:
+                refresh_occupancy(self.restaurant_id, [(self.table_id, self.period)])
+            if updated and status in WAITLIST_TRIGGER_STATUSES:
+                queue_promotion(self.restaurant_id, self.table_id, self.period)
+            if updated and status == ReservationStatus.COMPLETED:
+                ReviewEligibility.record_completed(self.user_id, self.restaurant_id)
+        
+        if not updated:
+            return False
+        
+        self.status = status
+        self.updated_at = now
+        reservation_days_changed(
+            self.restaurant_id,
+            [self.date, timezone.localtime(self.period.upper).date() if self.period else None]
+        )
+        return True
     
     def confirm(self):
-        self.status = ReservationStatus.CONFIRMED
-        self.save(update_fields=['status', 'updated_at'])
+        return self.transition(ReservationStatus.CONFIRMED)
     
     def seat(self):
-        self.status = ReservationStatus.SEATED
-        self.save(update_fields=['status', 'updated_at'])
+        return self.transition(ReservationStatus.SEATED)
     
     def complete(self):
-        self.status = ReservationStatus.COMPLETED
-        self.save(update_fields=['status', 'updated_at'])
+        return self.transition(ReservationStatus.COMPLETED)
     
     def cancel(self):
-        self.status = ReservationStatus.CANCELLED
-        self.save(update_fields=['status', 'updated_at'])
+        return self.transition(ReservationStatus.CANCELLED)
     
     def mark_no_show(self):
-        self.status = ReservationStatus.NO_SHOW
-        self.save(update_fields=['status', 'updated_at'])
+        return self.transition(ReservationStatus.NO_SHOW)
     
     @property
     def is_past(self):
@@ -185,3 +388,233 @@ class Reservation(models.Model):
             ReservationStatus.SEATED
         ]
 
+
+
+class WaitlistStatus(models.TextChoices):
+    WAITING = 'waiting', 'В листе ожидания'
+    PROMOTED = 'promoted', 'Бронь создана'
+    CANCELLED = 'cancelled', 'Отменено'
+
+
+class Waitlist(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name='user',
+        help_text='Guest waiting for a table'
+    )
+    restaurant = models.ForeignKey(
+        'restaurants.Restaurant',
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name='restaurant',
+        help_text='Restaurant'
+    )
+    date = models.DateField(
+        'date',
+        help_text='Requested date'
+    )
+    time_slot = models.TimeField(
+        'time',
+        help_text='Requested time'
+    )
+    guests_count = models.PositiveSmallIntegerField(
+        'guests count',
+        validators=[MinValueValidator(1), MaxValueValidator(20)],
+        help_text='Number of guests'
+    )
+    duration = models.PositiveSmallIntegerField(
+        'duration',
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(15), MaxValueValidator(720)],
+        help_text='Seating length in minutes, defaults to the restaurant setting'
+    )
+    priority = models.SmallIntegerField(
+        'priority',
+        default=0,
+        help_text='Higher priority is promoted first'
+    )
+    status = models.CharField(
+        'status',
+        max_length=20,
+        choices=WaitlistStatus.choices,
+        default=WaitlistStatus.WAITING,
+        help_text='Waitlist entry status'
+    )
+    # Reservations are partitioned and keyed by (id, date) in the database,
+    # so nothing can reference id alone with a foreign key constraint.
+    reservation = models.OneToOneField(
+        Reservation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name='waitlist_entry',
+        verbose_name='reservation',
+        help_text='Reservation created on promotion'
+    )
+    
+    created_at = models.DateTimeField('created at', auto_now_add=True)
+    updated_at = models.DateTimeField('updated at', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'waitlist entry'
+        verbose_name_plural = 'waitlist'
+        ordering = ['date', 'time_slot', '-priority', 'created_at']
+        indexes = [
+            # Promotion walks this index from the top: the best candidate for
+            # a freed slot is found without scanning the queue.
+            models.Index(
+                fields=['restaurant', 'date', 'time_slot', '-priority', '-guests_count', 'created_at'],
+                name='waitlist_queue',
+                condition=models.Q(status=WaitlistStatus.WAITING),
+            ),
+            models.Index(fields=['user']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'restaurant', 'date', 'time_slot'],
+                condition=models.Q(status=WaitlistStatus.WAITING),
+                name='waitlist_one_entry_per_slot',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.date} {self.time_slot} - {self.user_id}"
+
+
+class DailyOccupancy(models.Model):
+    """
+    Booked slots of every table of a restaurant on one day.
+
+    ``tables`` maps a table id to a bitmask of occupied ``SLOT_MINUTES``
+    slots counted from local midnight; tables without active bookings are
+    left out. Rows are maintained by ``reservations.occupancy`` in the same
+    transaction as the booking change.
+    """
+    SLOT_MINUTES = 15
+    SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+    
+    restaurant = models.ForeignKey(
+        'restaurants.Restaurant',
+        on_delete=models.CASCADE,
+        related_name='occupancy',
+        verbose_name='restaurant',
+        help_text='Restaurant'
+    )
+    date = models.DateField(
+        'date',
+        help_text='Local date the slots belong to'
+    )
+    tables = models.JSONField(
+        'tables',
+        default=dict,
+        help_text='Table id -> bitmask of booked slots'
+    )
+    updated_at = models.DateTimeField('updated at', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'daily occupancy'
+        verbose_name_plural = 'daily occupancy'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date'], name='daily_occupancy_restaurant_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.date}"
+    
+    @classmethod
+    def slot_index(cls, time_slot):
+        return (time_slot.hour * 60 + time_slot.minute) // cls.SLOT_MINUTES
+    
+    @classmethod
+    def slot_time(cls, index):
+        minutes = index * cls.SLOT_MINUTES
+        return time(minutes // 60, minutes % 60)
+    
+    def table_mask(self, table_id):
+        return self.tables.get(str(table_id), 0)
+    
+    def is_free(self, table_id, time_slot, duration):
+        """Whether the table has no booking in ``[time_slot, time_slot + duration)`` of this day."""
+        first = self.slot_index(time_slot)
+        count = -(-duration // self.SLOT_MINUTES)
+        window = ((1 << count) - 1) << first
+        return not self.table_mask(table_id) & window
+    
+    def free_slots(self, table_id):
+        """Start times of the free slots of a table on this day."""
+        mask = self.table_mask(table_id)
+        return [
+            self.slot_time(index) for index in range(self.SLOTS_PER_DAY)
+            if not mask >> index & 1
+        ]
+    
+    def has_free_table(self, table_ids, time_slot, duration):
+        """Whether any of the tables is free for ``duration`` minutes from ``time_slot``."""
+        return any(self.is_free(table_id, time_slot, duration) for table_id in table_ids)
+
+
+class ReservationArchive(models.Model):
+    """
+    Finished reservations moved out of the partitioned hot table.
+
+    Rows are written by ``archive_reservations`` with their original ids;
+    the table is not partitioned and is only read for reporting.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_reservations',
+        verbose_name='user',
+        help_text='User who made the reservation'
+    )
+    restaurant = models.ForeignKey(
+        'restaurants.Restaurant',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_reservations',
+        verbose_name='restaurant',
+        help_text='Restaurant for reservation'
+    )
+    table = models.ForeignKey(
+        'restaurants.Table',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_reservations',
+        verbose_name='table',
+        help_text='Reserved table'
+    )
+    date = models.DateField('date', help_text='Reservation date')
+    time_slot = models.TimeField('time', help_text='Reservation time')
+    duration = models.PositiveSmallIntegerField('duration', null=True, blank=True, help_text='Seating length in minutes')
+    period = DateTimeRangeField('period', null=True, blank=True, help_text='Time range the table was occupied')
+    guests_count = models.PositiveSmallIntegerField('guests count', help_text='Number of guests')
+    status = models.CharField(
+        'status',
+        max_length=20,
+        choices=ReservationStatus.choices,
+        help_text='Final reservation status'
+    )
+    special_requests = models.TextField('special requests', blank=True)
+    confirmation_sent = models.BooleanField('confirmation sent', default=False)
+    reminder_sent = models.BooleanField('reminder sent', default=False)
+    created_at = models.DateTimeField('created at')
+    updated_at = models.DateTimeField('updated at')
+    archived_at = models.DateTimeField('archived at', help_text='When the row was moved to the archive')
+    
+    class Meta:
+        verbose_name = 'archived reservation'
+        verbose_name_plural = 'archived reservations'
+        ordering = ['-date', '-time_slot']
+        indexes = [
+            models.Index(fields=['restaurant', 'date']),
+            models.Index(fields=['user']),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.date} {self.time_slot} - {self.status}"
@@ -0,0 +1,113 @@
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.utils import timezone
+
+from .models import Reservation, DailyOccupancy, ACTIVE_STATUSES
+
+
+SLOT_SECONDS = DailyOccupancy.SLOT_MINUTES * 60
+
+
+def day_bounds(date):
+    start = timezone.make_aware(datetime.combine(date, time.min))
+    return start, start + timedelta(days=1)
+
+
+def period_days(period):
+    """Local dates a booking period touches (two when it runs past midnight)."""
+    first = timezone.localtime(period.lower).date()
+    last = timezone.localtime(period.upper - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def slot_mask(period, date):
+    """Bitmask of the slots of ``date`` that ``period`` covers, partial slots included."""
+    day_start, day_end = day_bounds(date)
+    start = max(period.lower, day_start)
+    end = min(period.upper, day_end)
+    if start >= end:
+        return 0
+    first = int((start - day_start).total_seconds() // SLOT_SECONDS)
+    last = math.ceil((end - day_start).total_seconds() / SLOT_SECONDS)
+    return ((1 << (last - first)) - 1) << first
+
+
+def _day_masks(date, bookings):
+    masks = defaultdict(int)
+    for table_id, period in bookings:
+        masks[table_id] |= slot_mask(period, date)
+    return masks
+
+
+def _active_bookings(date, **filters):
+    # Bookings touching ``date`` start on it or the day before; the date
+    # bound keeps the scan to the partitions holding those days.
+    return Reservation.objects.filter(
+        date__range=(date - timedelta(days=1), date),
+        status__in=ACTIVE_STATUSES,
+        period__overlap=DateTimeTZRange(*day_bounds(date)),
+        **filters
+    ).values_list('table_id', 'period')
+
+
+def refresh_occupancy(restaurant_id, bookings):
+    """
+    Recompute the bitmaps of the tables and days ``bookings`` touch.
+
+    ``bookings`` are ``(table_id, period)`` pairs of reservations that were
+    just created, moved or released, old and new positions alike. Each
+    affected day locks its occupancy row, then reads its tables' active
+    bookings and rewrites their bits; call it inside the transaction that
+    changed the reservations.
+    """
+    tables_by_day = defaultdict(set)
+    for table_id, period in bookings:
+        if period is None:
+            continue
+        for date in period_days(period):
+            tables_by_day[date].add(table_id)
+
+    with transaction.atomic():
+        # Fixed lock order so concurrent refreshes cannot deadlock.
+        for date in sorted(tables_by_day):
+            table_ids = tables_by_day[date]
+            occupancy, _ = DailyOccupancy.objects.select_for_update().get_or_create(
+                restaurant_id=restaurant_id,
+                date=date
+            )
+            # Bookings are read only once the row is held: a concurrent
+            # refresh of the same day waits here and then sees our booking.
+            masks = _day_masks(date, _active_bookings(date, table_id__in=table_ids))
+            for table_id in table_ids:
+                if masks[table_id]:
+                    occupancy.tables[str(table_id)] = masks[table_id]
+                else:
+                    occupancy.tables.pop(str(table_id), None)
+            occupancy.save(update_fields=['tables', 'updated_at'])
+
+
+def rebuild_day(restaurant_id, date):
+    """Replace a restaurant-day's occupancy row with one derived from scratch."""
+    with transaction.atomic():
+        occupancy, _ = DailyOccupancy.objects.select_for_update().get_or_create(
+            restaurant_id=restaurant_id,
+            date=date
+        )
+        masks = _day_masks(date, _active_bookings(date, restaurant_id=restaurant_id))
+        tables = {str(table_id): mask for table_id, mask in masks.items() if mask}
+        if not tables:
+            # A missing row already reads as "nothing booked".
+            occupancy.delete()
+            return
+        occupancy.tables = tables
+        occupancy.save(update_fields=['tables', 'updated_at'])
+
+
+def get_occupancy(restaurant_id, date):
+    """The occupancy row of a restaurant-day; an empty one if nothing is booked."""
+    occupancy = DailyOccupancy.objects.filter(restaurant_id=restaurant_id, date=date).first()
+    return occupancy or DailyOccupancy(restaurant_id=restaurant_id, date=date)
@@ -0,0 +1,117 @@
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import ACTIVE_STATUSES, OVERLAP_CONSTRAINT
+
+
+TABLE = 'reservations_reservation'
+DEFAULT_PARTITION = f'{TABLE}_default'
+ARCHIVE_TABLE = 'reservations_reservationarchive'
+PARTITION_MONTHS_AHEAD = 12
+
+# Columns moved verbatim into the archive table.
+ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'restaurant_id', 'table_id', 'date', 'time_slot',
+    'duration', 'period', 'guests_count', 'status', 'special_requests',
+    'confirmation_sent', 'reminder_sent', 'created_at', 'updated_at',
+]
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_{month.year}_{month.month:02d}'
+
+
+def _add_overlap_constraint(cursor, partition, suffix):
+    # Postgres before 17 cannot put an exclusion constraint on the
+    # partitioned table itself, so every partition carries its own.
+    statuses = ', '.join(f"'{status}'" for status in ACTIVE_STATUSES)
+    cursor.execute(
+        f'ALTER TABLE {partition} ADD CONSTRAINT {OVERLAP_CONSTRAINT}_{suffix} '
+        f'EXCLUDE USING gist (table_id WITH =, period WITH &&) '
+        f'WHERE (status IN ({statuses}))'
+    )
+
+
+def _exists(cursor, relation):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [relation])
+    return cursor.fetchone()[0]
+
+
+def create_default_partition(cursor):
+    """Catch-all partition for dates no monthly partition covers yet."""
+    if _exists(cursor, DEFAULT_PARTITION):
+        return False
+    cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+    _add_overlap_constraint(cursor, DEFAULT_PARTITION, 'default')
+    return True
+
+
+def create_month_partition(cursor, month):
+    """
+    Attach the partition for ``month``, moving in any of its rows that
+    landed in the default partition meanwhile.
+    """
+    name = partition_name(month)
+    if _exists(cursor, name):
+        return False
+
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    if _exists(cursor, DEFAULT_PARTITION):
+        cursor.execute(
+            f'WITH moved AS ('
+            f'DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *'
+            f') INSERT INTO {name} SELECT * FROM moved',
+            [start, end]
+        )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    _add_overlap_constraint(cursor, name, f'{month.year}_{month.month:02d}')
+    return True
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, first_month=None):
+    """Make sure monthly partitions exist from ``first_month`` (this month by default) on."""
+    month = month_start(first_month or date.today())
+    created = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        create_default_partition(cursor)
+        for offset in range(months_ahead + 1):
+            created += create_month_partition(cursor, add_months(month, offset))
+    return created
+
+
+def archive_month(cursor, month, statuses):
+    """
+    Move finished reservations of ``month`` into the archive table in one
+    statement; drop the month's partition if nothing is left in it.
+
+    Rows are taken from the parent table by date, so months kept in the
+    default partition (or whose partition is already gone) are archived too.
+    """
+    columns = ', '.join(ARCHIVE_COLUMNS)
+    cursor.execute(
+        f'WITH moved AS ('
+        f'DELETE FROM {TABLE} WHERE date >= %s AND date < %s AND status = ANY(%s) '
+        f'RETURNING {columns}'
+        f') INSERT INTO {ARCHIVE_TABLE} ({columns}, archived_at) '
+        f'SELECT {columns}, now() FROM moved',
+        [month, add_months(month, 1), list(statuses)]
+    )
+    moved = cursor.rowcount
+
+    name = partition_name(month)
+    if _exists(cursor, name):
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {name})')
+        if not cursor.fetchone()[0]:
+            cursor.execute(f'DROP TABLE {name}')
+    return moved
@@ -1,7 +1,22 @@
+from datetime import timedelta
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
 from rest_framework import serializers
+from django.db import transaction, IntegrityError
+from django.db.models import Q
 from django.utils import timezone
-from .models import Reservation, ReservationStatus
+from .exceptions import ReservationConflict
+from .models import (
+    Reservation, ReservationStatus, ReservationOverlapError, Waitlist, WaitlistStatus,
+    ACTIVE_STATUSES, guard_month_boundary, is_overlap_violation, reservation_days_changed,
+    reservation_period
+)
+from .occupancy import refresh_occupancy
 from users.serializers import UserMinimalSerializer
+from restaurants.availability import free_tables
+from restaurants.models import Restaurant, Table
 from restaurants.serializers import RestaurantListSerializer, TableMinimalSerializer
 
 
@@ -15,7 +30,7 @@ class ReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = [
             'id', 'user', 'restaurant', 'table',
-            'date', 'time_slot', 'guests_count',
+            'date', 'time_slot', 'duration', 'guests_count',
             'status', 'status_display',
             'special_requests',
             'confirmation_sent', 'reminder_sent',
@@ -32,7 +47,7 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = [
             'restaurant', 'table', 'date', 'time_slot',
-            'guests_count', 'special_requests'
+            'duration', 'guests_count', 'special_requests'
         ]
     
     def validate(self, attrs):
@@ -72,34 +87,24 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
                 'restaurant': 'This restaurant is not accepting reservations'
             })
         
-        conflicting = Reservation.objects.filter(
-            table=table,
-            date=attrs['date'],
-            time_slot=time_slot,
-            status__in=[
-                ReservationStatus.PENDING,
-                ReservationStatus.CONFIRMED,
-                ReservationStatus.SEATED
-            ]
-        )
-        
-        if conflicting.exists():
-            raise serializers.ValidationError({
-                'table': 'This table is already reserved for this time slot'
-            })
-        
         return attrs
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         validated_data['status'] = ReservationStatus.PENDING
-        return Reservation.objects.create(**validated_data)
+        # No lock or pre-check here: the exclusion constraint makes concurrent
+        # inserts for the same table wait on each other and lets exactly one
+        # win, while bookings for other tables never contend.
+        try:
+            return Reservation.objects.create(**validated_data)
+        except ReservationOverlapError:
+            raise ReservationConflict()
 
 
 class ReservationUpdateSerializer(serializers.ModelSerializer):    
     class Meta:
         model = Reservation
-        fields = ['date', 'time_slot', 'guests_count', 'special_requests']
+        fields = ['date', 'time_slot', 'duration', 'guests_count', 'special_requests']
     
     def validate(self, attrs):
         instance = self.instance
@@ -123,23 +128,161 @@ class ReservationUpdateSerializer(serializers.ModelSerializer):
                 'guests_count': f'Number of guests ({guests_count}) exceeds table capacity ({instance.table.capacity})'
             })
         
-        conflicting = Reservation.objects.filter(
-            table=instance.table,
-            date=date,
-            time_slot=time_slot,
-            status__in=[
-                ReservationStatus.PENDING,
-                ReservationStatus.CONFIRMED,
-                ReservationStatus.SEATED
-            ]
-        ).exclude(pk=instance.pk)
-        
-        if conflicting.exists():
+        return attrs
+    
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except ReservationOverlapError:
+            raise ReservationConflict()
+
+
+class BulkReservationItemSerializer(serializers.Serializer):
+    table = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+    time_slot = serializers.TimeField()
+    guests_count = serializers.IntegerField(min_value=1, max_value=20)
+    duration = serializers.IntegerField(required=False, min_value=15, max_value=720)
+    special_requests = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class ReservationBulkCreateSerializer(serializers.Serializer):
+    """
+    Books many tables of one restaurant at once, all or nothing.
+
+    The batch is checked with two queries (its tables, and active bookings
+    overlapping any requested period) instead of a full_clean per row, and
+    written with a single bulk_create.
+    """
+    restaurant = serializers.PrimaryKeyRelatedField(queryset=Restaurant.objects.all())
+    reservations = BulkReservationItemSerializer(many=True, min_length=1, max_length=50)
+    
+    def validate(self, attrs):
+        restaurant = attrs['restaurant']
+        items = attrs['reservations']
+        
+        if not restaurant.is_active:
             raise serializers.ValidationError({
-                'time_slot': 'This table is already reserved for this time slot'
+                'restaurant': 'This restaurant is not accepting reservations'
             })
         
+        tables = Table.objects.filter(
+            restaurant=restaurant,
+            pk__in={item['table'] for item in items}
+        ).in_bulk()
+        today = timezone.now().date()
+        errors = [{} for _ in items]
+        
+        for item, item_errors in zip(items, errors):
+            item.setdefault('duration', restaurant.reservation_duration)
+            item['period'] = reservation_period(item['date'], item['time_slot'], item['duration'])
+            table = tables.get(item['table'])
+            
+            if item['date'] < today:
+                item_errors['date'] = 'Reservation date cannot be in the past'
+            if item['time_slot'] < restaurant.opening_time or item['time_slot'] >= restaurant.closing_time:
+                item_errors['time_slot'] = (
+                    f'Reservation time must be between {restaurant.opening_time} '
+                    f'and {restaurant.closing_time}'
+                )
+            if table is None:
+                item_errors['table'] = 'Selected table does not belong to this restaurant'
+            elif not table.is_available:
+                item_errors['table'] = 'Selected table is not available'
+            elif item['guests_count'] > table.capacity:
+                item_errors['guests_count'] = (
+                    f'Number of guests ({item["guests_count"]}) exceeds '
+                    f'table capacity ({table.capacity})'
+                )
+        
+        self._check_overlaps(items, errors)
+        
+        if any(errors):
+            raise serializers.ValidationError({'reservations': [
+                {field: [message] for field, message in item_errors.items()}
+                for item_errors in errors
+            ]})
+        
+        attrs['tables'] = tables
         return attrs
+    
+    def _check_overlaps(self, items, errors):
+        by_table = defaultdict(list)
+        for index, item in enumerate(items):
+            by_table[item['table']].append(index)
+        
+        # Within the batch: neighbours in start order must not overlap.
+        for indexes in by_table.values():
+            indexes.sort(key=lambda index: items[index]['period'].lower)
+            for previous, current in zip(indexes, indexes[1:]):
+                if items[current]['period'].lower < items[previous]['period'].upper:
+                    errors[current].setdefault('table', 'Overlaps another reservation in this batch')
+        
+        # Against the database: one query, each branch an index probe, and
+        # the batch's date span bounds the partitions it reads.
+        dates = [item['date'] for item in items]
+        booked = Reservation.objects.filter(
+            reduce(or_, (
+                Q(table_id=item['table'], period__overlap=item['period'])
+                for item in items
+            )),
+            date__range=(min(dates) - timedelta(days=1), max(dates) + timedelta(days=1)),
+            status__in=ACTIVE_STATUSES
+        ).values_list('table_id', 'period')
+        
+        taken = defaultdict(list)
+        for table_id, period in booked:
+            taken[table_id].append(period)
+        for item, item_errors in zip(items, errors):
+            period = item['period']
+            if any(other.lower < period.upper and period.lower < other.upper for other in taken[item['table']]):
+                item_errors.setdefault('table', 'This table is already reserved for this time slot')
+    
+    def create(self, validated_data):
+        restaurant = validated_data['restaurant']
+        tables = validated_data['tables']
+        user = self.context['request'].user
+        
+        reservations = [
+            Reservation(
+                user=user,
+                restaurant=restaurant,
+                table=tables[item['table']],
+                date=item['date'],
+                time_slot=item['time_slot'],
+                duration=item['duration'],
+                period=item['period'],
+                guests_count=item['guests_count'],
+                special_requests=item['special_requests'],
+                status=ReservationStatus.PENDING
+            )
+            for item in validated_data['reservations']
+        ]
+        
+        # A booking that slipped in since validation trips the exclusion
+        # constraint and rolls the whole batch back.
+        try:
+            with transaction.atomic():
+                guard_month_boundary([
+                    (reservation.table_id, reservation.period) for reservation in reservations
+                ])
+                created = Reservation.objects.bulk_create(reservations)
+                refresh_occupancy(restaurant.id, [
+                    (reservation.table_id, reservation.period) for reservation in created
+                ])
+                reservation_days_changed(restaurant.id, [
+                    day for reservation in created
+                    for day in (
+                        reservation.date, timezone.localtime(reservation.period.upper).date()
+                    )
+                ])
+        except ReservationOverlapError:
+            raise ReservationConflict()
+        except IntegrityError as exc:
+            if is_overlap_violation(exc):
+                raise ReservationConflict()
+            raise
+        return created
 
 
 class ReservationListSerializer(serializers.ModelSerializer):    
@@ -162,19 +305,9 @@ class ReservationStatusUpdateSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=ReservationStatus.choices)
     
     def validate_status(self, value):
-        instance = self.context.get('reservation')
-        current_status = instance.status
-        
-        allowed_transitions = {
-            ReservationStatus.PENDING: [ReservationStatus.CONFIRMED, ReservationStatus.CANCELLED],
-            ReservationStatus.CONFIRMED: [ReservationStatus.SEATED, ReservationStatus.CANCELLED, ReservationStatus.NO_SHOW],
-            ReservationStatus.SEATED: [ReservationStatus.COMPLETED, ReservationStatus.CANCELLED],
-            ReservationStatus.COMPLETED: [],
-            ReservationStatus.CANCELLED: [],
-            ReservationStatus.NO_SHOW: [],
-        }
-        
-        if value not in allowed_transitions.get(current_status, []):
+        current_status = self.instance.status
+        
+        if not self.instance.can_transition(value):
             raise serializers.ValidationError(
                 f"Cannot change status from {current_status} to {value}"
             )
@@ -182,21 +315,9 @@ class ReservationStatusUpdateSerializer(serializers.Serializer):
         return value
     
     def save(self):
-        instance = self.context['reservation']
-        status = self.validated_data['status']
-        
-        if status == ReservationStatus.CONFIRMED:
-            instance.confirm()
-        elif status == ReservationStatus.SEATED:
-            instance.seat()
-        elif status == ReservationStatus.COMPLETED:
-            instance.complete()
-        elif status == ReservationStatus.CANCELLED:
-            instance.cancel()
-        elif status == ReservationStatus.NO_SHOW:
-            instance.mark_no_show()
-        
-        return instance
+        if not self.instance.transition(self.validated_data['status']):
+            raise ReservationConflict('Reservation status was changed by another request.')
+        return self.instance
 
 
 class ReservationMinimalSerializer(serializers.ModelSerializer):    
@@ -204,3 +325,66 @@ class ReservationMinimalSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = ['id', 'date', 'time_slot', 'status']
         read_only_fields = ['id']
+
+
+class WaitlistSerializer(serializers.ModelSerializer):
+    restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Waitlist
+        fields = [
+            'id', 'restaurant', 'restaurant_name',
+            'date', 'time_slot', 'guests_count', 'duration',
+            'priority', 'status', 'status_display', 'reservation',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+class WaitlistJoinSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Waitlist
+        fields = ['restaurant', 'date', 'time_slot', 'guests_count', 'duration']
+    
+    def validate(self, attrs):
+        if attrs['date'] < timezone.now().date():
+            raise serializers.ValidationError({
+                'date': 'Reservation date cannot be in the past'
+            })
+        
+        restaurant = attrs['restaurant']
+        time_slot = attrs['time_slot']
+        
+        if not restaurant.is_active:
+            raise serializers.ValidationError({
+                'restaurant': 'This restaurant is not accepting reservations'
+            })
+        
+        if time_slot < restaurant.opening_time or time_slot >= restaurant.closing_time:
+            raise serializers.ValidationError({
+                'time_slot': f'Reservation time must be between {restaurant.opening_time} and {restaurant.closing_time}'
+            })
+        
+        duration = attrs.get('duration') or restaurant.reservation_duration
+        if free_tables(restaurant.id, attrs['date'], time_slot, attrs['guests_count'], duration).exists():
+            raise serializers.ValidationError({
+                'time_slot': 'Tables are available for this time, please book directly'
+            })
+        
+        if Waitlist.objects.filter(
+            user=self.context['request'].user,
+            restaurant=restaurant,
+            date=attrs['date'],
+            time_slot=time_slot,
+            status=WaitlistStatus.WAITING
+        ).exists():
+            raise serializers.ValidationError({
+                'time_slot': 'You are already on the waitlist for this time'
+            })
+        
+        return attrs
+    
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        return Waitlist.objects.create(**validated_data)
@@ -1,60 +1,344 @@
+import logging
+from collections import defaultdict
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, timedelta
+
+
+logger = logging.getLogger(__name__)
+
+REMINDER_CHUNK_SIZE = 500
+# A claim older than this belongs to a worker that died before sending.
+REMINDER_CLAIM_MINUTES = 30
+NO_SHOW_LOOKBACK_DAYS = 7
+ARCHIVE_AFTER_MONTHS = 12
+
+
+def _reminder_email(r, from_email):
+    subject = f'Напоминание о бронировании в {r.restaurant.name} на {r.date}'
+    message = (
+        f'Здравствуйте, {r.user.first_name or r.user.email}!\n\n'
+        f'Напоминаем о вашем бронировании в ресторане {r.restaurant.name} ' 
+        f'на {r.date} в {r.time_slot}.\n\n'
+        'Если нужно отменить или изменить — пожалуйста, используйте ваш профиль.'
+    )
+    return EmailMessage(subject, message, from_email, [r.user.email])
+
+
+def _reminder_due(now):
+    """Reminders not sent yet and not held by a live claim."""
+    stale = now - timedelta(minutes=REMINDER_CLAIM_MINUTES)
+    return Q(reminder_sent=False) & (
+        Q(reminder_claimed_at__isnull=True) | Q(reminder_claimed_at__lt=stale)
+    )
 
 
 @shared_task(name='reservations.tasks.send_reservation_reminders')
 def send_reservation_reminders():
+    """
+    Split tomorrow's pending reminders into chunks, one subtask each.
+
+    Runs hourly through the day; rows already sent or claimed by a running
+    chunk are skipped, so later runs only pick up what an earlier one lost.
+    """
     from .models import Reservation, ReservationStatus
 
-    tomorrow = timezone.now().date() + timedelta(days=1)
-    qs = Reservation.objects.filter(
+    now = timezone.now()
+    tomorrow = now.date() + timedelta(days=1)
+    ids = Reservation.objects.filter(
+        _reminder_due(now),
         date=tomorrow,
         status__in=[ReservationStatus.PENDING, ReservationStatus.CONFIRMED],
-        reminder_sent=False,
-    ).select_related('user', 'restaurant')
-
-    results = []
-    for r in qs:
-        try:
-            subject = f'Напоминание о бронировании в {r.restaurant.name} на {r.date}'
-            message = (
-                f'Здравствуйте, {r.user.first_name or r.user.email}!\n\n'
-                f'Напоминаем о вашем бронировании в ресторане {r.restaurant.name} ' 
-                f'на {r.date} в {r.time_slot}.\n\n'
-                'Если нужно отменить или изменить — пожалуйста, используйте ваш профиль.'
-            )
-            from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com')
-            send_mail(subject, message, from_email, [r.user.email], fail_silently=False)
-            r.reminder_sent = True
-            r.save(update_fields=['reminder_sent'])
-            results.append((r.id, 'sent'))
-        except Exception as e:
-            results.append((r.id, str(e)))
-
-    return results
+    ).order_by('id').values_list('id', flat=True)
 
+    chunks = 0
+    chunk = []
+    for reservation_id in ids.iterator(chunk_size=REMINDER_CHUNK_SIZE):
+        chunk.append(reservation_id)
+        if len(chunk) == REMINDER_CHUNK_SIZE:
+            send_reminder_chunk.delay(chunk)
+            chunks += 1
+            chunk = []
+    if chunk:
+        send_reminder_chunk.delay(chunk)
+        chunks += 1
 
-@shared_task(name='reservations.tasks.mark_no_shows')
-def mark_no_shows():
+    return chunks
+
+
+@shared_task(name='reservations.tasks.send_reminder_chunk', acks_late=True)
+def send_reminder_chunk(reservation_ids):
+    """
+    Send reminders for one chunk over a single SMTP connection.
+
+    Rows are claimed (``reminder_claimed_at``) in one UPDATE before anything
+    is sent, so a chunk redelivered after a worker restart, or overlapping a
+    concurrent run, skips them instead of mailing twice. ``reminder_sent``
+    is set only for messages that went out; failed rows are released at
+    once, and rows of a worker that died mid-chunk become claimable again
+    after ``REMINDER_CLAIM_MINUTES``.
+    """
     from .models import Reservation, ReservationStatus
-    delta_minutes = 60 
+
+    now = timezone.now()
+    with transaction.atomic():
+        claimed = list(
+            Reservation.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                _reminder_due(now),
+                pk__in=reservation_ids,
+                status__in=[ReservationStatus.PENDING, ReservationStatus.CONFIRMED],
+            ).select_related('user', 'restaurant')
+        )
+        Reservation.objects.filter(pk__in=[r.pk for r in claimed]).update(reminder_claimed_at=now)
+
+    if not claimed:
+        return {'sent': 0, 'failed': []}
+
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com')
+    sent = set()
+    try:
+        with get_connection() as connection:
+            for r in claimed:
+                # One message per call keeps a bad address from failing the
+                # rest of the chunk; the connection stays open throughout.
+                try:
+                    connection.send_messages([_reminder_email(r, from_email)])
+                    sent.add(r.id)
+                except Exception:
+                    logger.exception('send_reminder_chunk failed reservation=%d', r.id)
+    except Exception:
+        # The connection could not be opened or closed cleanly; anything
+        # not sent is released below.
+        logger.exception('send_reminder_chunk connection failed chunk=%d', len(claimed))
+
+    Reservation.objects.filter(pk__in=sent).update(reminder_sent=True)
+    failed = [r.id for r in claimed if r.id not in sent]
+    if failed:
+        Reservation.objects.filter(pk__in=failed).update(reminder_claimed_at=None)
+
+    return {'sent': len(sent), 'failed': failed}
+
+
+@shared_task(name='reservations.tasks.mark_no_shows')
+def mark_no_shows(delta_minutes=60):
+    """
+    Mark confirmed reservations whose start passed more than
+    ``delta_minutes`` ago as no-shows, in a single UPDATE.
+
+    Reservation.save is bypassed on purpose: full_clean rejects past dates,
+    and a status change needs no per-row validation. Only the last
+    ``NO_SHOW_LOOKBACK_DAYS`` are looked at, so the hourly run reads the
+    newest partitions only; the older backlog was marked once by
+    migration 0009. Each freed table is offered to the waitlist
+    once the update commits.
+    """
+    from .models import Reservation, ReservationStatus, reservation_days_changed
+    from .occupancy import refresh_occupancy
+
     now = timezone.now()
-    cutoff = now - timedelta(minutes=delta_minutes)
+    cutoff = timezone.localtime(now) - timedelta(minutes=delta_minutes)
 
     qs = Reservation.objects.filter(
+        Q(date__lt=cutoff.date()) | Q(date=cutoff.date(), time_slot__lt=cutoff.time()),
+        date__gte=cutoff.date() - timedelta(days=NO_SHOW_LOOKBACK_DAYS),
         status=ReservationStatus.CONFIRMED,
-        date__lt=now.date()
     )
-    updated = []
-    for r in qs:
-        try:
-            r.status = ReservationStatus.NO_SHOW
-            r.save(update_fields=['status'])
-            updated.append(r.id)
-        except Exception:
-            continue
+    with transaction.atomic():
+        # Locked first and updated by pk, so the rows whose occupancy is
+        # refreshed are exactly the ones marked, even if one is confirmed
+        # again or cancelled meanwhile.
+        ids = []
+        bookings = defaultdict(list)
+        for pk, restaurant_id, table_id, date, period in qs.select_for_update().values_list(
+            'pk', 'restaurant_id', 'table_id', 'date', 'period'
+        ):
+            ids.append(pk)
+            bookings[restaurant_id].append((table_id, date, period))
+        updated = Reservation.objects.filter(pk__in=ids).update(
+            status=ReservationStatus.NO_SHOW, updated_at=now
+        )
+        # A no-show frees its table for the rest of the evening.
+        for restaurant_id, rows in bookings.items():
+            reservation_days_changed(restaurant_id, [date for _, date, _ in rows])
+            refresh_occupancy(restaurant_id, [(table_id, period) for table_id, _, period in rows])
+            for table_id, _, period in rows:
+                queue_promotion(restaurant_id, table_id, period)
 
+    logger.info('mark_no_shows marked=%d cutoff=%s', updated, cutoff.isoformat())
     return updated
+
+
+@shared_task(name='reservations.tasks.ensure_reservation_partitions')
+def ensure_reservation_partitions():
+    """Create the monthly reservation partitions for the coming year."""
+    from .partitions import ensure_partitions
+
+    created = ensure_partitions()
+    logger.info('ensure_reservation_partitions created=%d', created)
+    return created
+
+
+@shared_task(name='reservations.tasks.archive_reservations')
+def archive_reservations(months=ARCHIVE_AFTER_MONTHS):
+    """
+    Move completed, cancelled and no-show reservations older than ``months``
+    into ``ReservationArchive``, one month per transaction.
+
+    Each month is a single DELETE ... RETURNING feeding an INSERT; a
+    partition left empty is dropped, so the hot table only keeps recent
+    months plus old bookings that never reached a final status.
+    """
+    from django.db import connection
+    from .models import ReservationStatus
+    from .partitions import TABLE, add_months, archive_month, month_start
+
+    final_statuses = [
+        ReservationStatus.COMPLETED, ReservationStatus.CANCELLED, ReservationStatus.NO_SHOW
+    ]
+    cutoff = add_months(month_start(timezone.localdate()), -months)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(date) FROM {TABLE} WHERE date < %s', [cutoff])
+        first = cursor.fetchone()[0]
+
+    archived = 0
+    month = month_start(first) if first else cutoff
+    while month < cutoff:
+        with transaction.atomic(), connection.cursor() as cursor:
+            archived += archive_month(cursor, month, final_statuses)
+        month = add_months(month, 1)
+
+    logger.info('archive_reservations archived=%d cutoff=%s', archived, cutoff.isoformat())
+    return archived
+
+
+PROMOTION_CANDIDATES = 10
+
+
+def queue_promotion(restaurant_id, table_id, period):
+    """Offer a table released for ``period`` to the waitlist once the transaction commits."""
+    if period is None:
+        return
+    transaction.on_commit(lambda: promote_waitlist.delay(
+        restaurant_id, table_id, period.lower.isoformat(), period.upper.isoformat()
+    ))
+
+
+@shared_task(name='reservations.tasks.promote_waitlist')
+def promote_waitlist(restaurant_id, table_id, start, end):
+    """
+    Offer a table freed from ``start`` to ``end`` to the waitlist.
+
+    Only the part of the period still ahead counts: an entry qualifies if
+    its seating (its own duration or the restaurant's) starts no earlier
+    than now and ends within the freed period. The partial ``waitlist_queue``
+    index is walked one (date, time) slot at a time, earliest first: one
+    index probe finds the next slot with waiting entries, and within a
+    slot the head of the index is promotion order (priority, then the
+    largest party the table seats, then first come), so at most
+    ``PROMOTION_CANDIDATES`` entries are read and locked per slot. The
+    first one whose booking passes validation and the overlap constraint
+    gets the table.
+    """
+    from django.core.exceptions import ValidationError
+    from django.db.models import Value
+    from django.db.models.functions import Coalesce
+    from restaurants.models import Table
+    from .models import Reservation, ReservationStatus, Waitlist, WaitlistStatus
+
+    start = max(parse_datetime(start), timezone.now())
+    end = parse_datetime(end)
+    if start >= end:
+        return None
+
+    table = Table.objects.select_related('restaurant').filter(pk=table_id, is_available=True).first()
+    if table is None:
+        return None
+
+    local_start, local_end = timezone.localtime(start), timezone.localtime(end)
+    window = Q()
+    day = local_start.date()
+    while day <= local_end.date():
+        slot = Q(date=day)
+        if day == local_start.date():
+            slot &= Q(time_slot__gte=local_start.time())
+        if day == local_end.date():
+            slot &= Q(time_slot__lt=local_end.time())
+        window |= slot
+        day += timedelta(days=1)
+
+    waiting = Waitlist.objects.filter(
+        window,
+        restaurant_id=restaurant_id,
+        status=WaitlistStatus.WAITING,
+    )
+    slot = None
+    while True:
+        later = Q() if slot is None else Q(date__gt=slot[0]) | Q(date=slot[0], time_slot__gt=slot[1])
+        slot = waiting.filter(later).order_by('date', 'time_slot').values_list(
+            'date', 'time_slot'
+        ).first()
+        if slot is None:
+            return None
+
+        date, time_slot = slot
+        seating_start = timezone.make_aware(datetime.combine(date, time_slot))
+        minutes_left = int((end - seating_start).total_seconds() // 60)
+
+        with transaction.atomic():
+            candidates = Waitlist.objects.select_for_update(skip_locked=True, of=('self',)).alias(
+                seating=Coalesce('duration', Value(table.restaurant.reservation_duration))
+            ).filter(
+                restaurant_id=restaurant_id,
+                date=date,
+                time_slot=time_slot,
+                status=WaitlistStatus.WAITING,
+                guests_count__lte=table.capacity,
+                seating__lte=minutes_left,
+            ).select_related('user').order_by(
+                '-priority', '-guests_count', 'created_at'
+            )[:PROMOTION_CANDIDATES]
+
+            for entry in candidates:
+                try:
+                    reservation = Reservation.objects.create(
+                        user=entry.user,
+                        restaurant=table.restaurant,
+                        table=table,
+                        date=date,
+                        time_slot=time_slot,
+                        duration=entry.duration,
+                        guests_count=entry.guests_count,
+                        status=ReservationStatus.PENDING,
+                    )
+                except ValidationError:
+                    # Covers ReservationOverlapError: the table may have been
+                    # booked again since it was freed.
+                    continue
+
+                entry.status = WaitlistStatus.PROMOTED
+                entry.reservation = reservation
+                entry.save(update_fields=['status', 'reservation', 'updated_at'])
+                transaction.on_commit(lambda: _notify_promoted(reservation))
+                logger.info('promote_waitlist entry=%d reservation=%d', entry.id, reservation.id)
+                return reservation.id
+
+
+def _notify_promoted(reservation):
+    send_mail(
+        f'Столик в {reservation.restaurant.name} освободился',
+        (
+            f'Здравствуйте, {reservation.user.first_name or reservation.user.email}!\n\n'
+            f'Для вас забронирован столик в ресторане {reservation.restaurant.name} '
+            f'на {reservation.date} в {reservation.time_slot}.'
+        ),
+        getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com'),
+        [reservation.user.email],
+        fail_silently=True,
+    )
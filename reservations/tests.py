@@ -1,3 +1,251 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from restaurants.models import Restaurant, Table
+from users.models import User
+from .models import (
+    DailyOccupancy, Reservation, ReservationStatus, Waitlist, WaitlistStatus, reservation_period
+)
+from .occupancy import get_occupancy
+from .tasks import mark_no_shows, promote_waitlist
+
+
+class PeriodMigrationTests(TransactionTestCase):
+    """0004 must build the overlap constraint over bookings the old exact-time check let in."""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets or executor.loader.graph.leaf_nodes())
+        executor.loader.build_graph()
+        return executor.loader.project_state(list(executor.loader.applied_migrations)).apps
+
+    def setUp(self):
+        self.apps = self.migrate([('reservations', '0003_initial')])
+
+    def tearDown(self):
+        self.migrate(None)
+
+    def insert(self, user, table, day, time_slot, status='confirmed'):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO reservations_reservation (user_id, restaurant_id, table_id, date, "
+                "time_slot, guests_count, status, special_requests, confirmation_sent, "
+                "reminder_sent, created_at, updated_at) "
+                "VALUES (%s, %s, %s, %s, %s, 2, %s, '', false, false, now(), now()) RETURNING id",
+                [user.id, table.restaurant_id, table.id, day, time_slot, status]
+            )
+            return cursor.fetchone()[0]
+
+    def test_later_overlapping_bookings_lose_their_period(self):
+        User = self.apps.get_model('users', 'User')
+        Restaurant = self.apps.get_model('restaurants', 'Restaurant')
+        Table = self.apps.get_model('restaurants', 'Table')
+        owner = User.objects.create(email='owner@example.com', first_name='Owner', last_name='Test')
+        guest = User.objects.create(email='guest@example.com', first_name='Guest', last_name='Test')
+        restaurant = Restaurant.objects.create(
+            owner=owner, name='Test', description='Test', cuisine_type='russian',
+            phone='+79161234567', email='r@example.com', address='Test', city='Москва',
+            opening_time=time(10), closing_time=time(23), reservation_duration=120
+        )
+        table = Table.objects.create(restaurant=restaurant, table_number='1', capacity=4)
+        day = date.today() + timedelta(days=1)
+
+        first = self.insert(guest, table, day, time(19))
+        overlapping = self.insert(guest, table, day, time(19, 30))
+        # Overlaps only the released booking, so it keeps its period.
+        after_first = self.insert(guest, table, day, time(21))
+        cancelled = self.insert(guest, table, day, time(19), status='cancelled')
+
+        self.migrate([('reservations', '0004_reservation_period')])
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM reservations_reservation WHERE period IS NULL')
+            released = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(released, {overlapping})
+        self.assertNotIn(first, released)
+        self.assertNotIn(after_first, released)
+        self.assertNotIn(cancelled, released)
+
+
+class NoShowPromotionTests(TestCase):
+    """A no-show frees the rest of its seating for the waitlist."""
+
+    def setUp(self):
+        owner = User.objects.create_user(
+            'owner@example.com', 'password', first_name='Owner', last_name='Test'
+        )
+        self.guest = User.objects.create_user(
+            'guest@example.com', 'password', first_name='Guest', last_name='Test'
+        )
+        self.waiting = User.objects.create_user(
+            'waiting@example.com', 'password', first_name='Waiting', last_name='Test'
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=owner, name='Test', description='Test', cuisine_type='russian',
+            phone='+79161234567', email='r@example.com', address='Test', city='Москва',
+            opening_time=time(0), closing_time=time(23, 59), reservation_duration=120
+        )
+        self.table = Table.objects.create(restaurant=self.restaurant, table_number='1', capacity=4)
+        self.now = timezone.localtime().replace(second=0, microsecond=0)
+
+    def book_started(self, minutes_ago, duration):
+        start = self.now - timedelta(minutes=minutes_ago)
+        # Created directly: the booking lies in the past, which save() rejects.
+        return Reservation.objects.bulk_create([Reservation(
+            user=self.guest, restaurant=self.restaurant, table=self.table,
+            date=start.date(), time_slot=start.time(), duration=duration,
+            period=reservation_period(start.date(), start.time(), duration),
+            guests_count=2, status=ReservationStatus.CONFIRMED,
+        )])[0]
+
+    def wait_for(self, minutes_ahead, duration):
+        start = self.now + timedelta(minutes=minutes_ahead)
+        return Waitlist.objects.create(
+            user=self.waiting, restaurant=self.restaurant, date=start.date(),
+            time_slot=start.time(), guests_count=2, duration=duration
+        )
+
+    def mark_no_shows(self):
+        with mock.patch.object(promote_waitlist, 'delay', side_effect=promote_waitlist), \
+                self.captureOnCommitCallbacks(execute=True):
+            return mark_no_shows()
+
+    def test_waiting_entry_inside_the_freed_period_is_promoted(self):
+        self.book_started(minutes_ago=90, duration=240)
+        entry = self.wait_for(minutes_ahead=30, duration=60)
+
+        self.assertEqual(self.mark_no_shows(), 1)
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistStatus.PROMOTED)
+        self.assertEqual(entry.reservation.table, self.table)
+        self.assertEqual(entry.reservation.time_slot, entry.time_slot)
+        self.assertEqual(mail.outbox[0].to, [self.waiting.email])
+
+    def test_waiting_entry_running_past_the_freed_period_keeps_waiting(self):
+        self.book_started(minutes_ago=90, duration=240)
+        entry = self.wait_for(minutes_ahead=30, duration=180)
+
+        self.assertEqual(self.mark_no_shows(), 1)
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistStatus.WAITING)
+
+
+class DailyOccupancyTests(TestCase):
+    """The occupancy row answers free-slot questions for a day without reading bookings."""
+
+    def setUp(self):
+        owner = User.objects.create_user(
+            'owner@example.com', 'password', first_name='Owner', last_name='Test'
+        )
+        guest = User.objects.create_user(
+            'guest@example.com', 'password', first_name='Guest', last_name='Test'
+        )
+        restaurant = Restaurant.objects.create(
+            owner=owner, name='Test', description='Test', cuisine_type='russian',
+            phone='+79161234567', email='r@example.com', address='Test', city='Москва',
+            opening_time=time(10), closing_time=time(23), reservation_duration=120
+        )
+        self.booked = Table.objects.create(restaurant=restaurant, table_number='1', capacity=4)
+        self.other = Table.objects.create(restaurant=restaurant, table_number='2', capacity=4)
+        self.day = date.today() + timedelta(days=1)
+        Reservation.objects.create(
+            user=guest, restaurant=restaurant, table=self.booked,
+            date=self.day, time_slot=time(19), guests_count=2
+        )
+        self.occupancy = get_occupancy(restaurant.id, self.day)
+
+    def test_free_slots_skip_the_booked_seating(self):
+        slots = self.occupancy.free_slots(self.booked.id)
+
+        self.assertEqual(len(slots), DailyOccupancy.SLOTS_PER_DAY - 8)
+        self.assertIn(time(18, 45), slots)
+        self.assertNotIn(time(19), slots)
+        self.assertNotIn(time(20, 45), slots)
+        self.assertIn(time(21), slots)
+        self.assertEqual(len(self.occupancy.free_slots(self.other.id)), DailyOccupancy.SLOTS_PER_DAY)
+
+    def test_has_free_table(self):
+        self.assertFalse(self.occupancy.has_free_table([self.booked.id], time(20), 60))
+        self.assertTrue(self.occupancy.has_free_table([self.booked.id], time(21), 60))
+        self.assertTrue(self.occupancy.has_free_table([self.booked.id, self.other.id], time(20), 60))
+
+
+class ReservationApiTests(TestCase):
+    """Overlapping bookings are turned away by the API without a partial write."""
+
+    def setUp(self):
+        owner = User.objects.create_user(
+            'owner@example.com', 'password', first_name='Owner', last_name='Test'
+        )
+        self.guest = User.objects.create_user(
+            'guest@example.com', 'password', first_name='Guest', last_name='Test'
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=owner, name='Test', description='Test', cuisine_type='russian',
+            phone='+79161234567', email='r@example.com', address='Test', city='Москва',
+            opening_time=time(10), closing_time=time(23), reservation_duration=120
+        )
+        self.table = Table.objects.create(restaurant=self.restaurant, table_number='1', capacity=4)
+        self.other = Table.objects.create(restaurant=self.restaurant, table_number='2', capacity=4)
+        self.day = date.today() + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def book(self, table, time_slot):
+        return Reservation.objects.create(
+            user=self.guest, restaurant=self.restaurant, table=table,
+            date=self.day, time_slot=time_slot, guests_count=2
+        )
+
+    def item(self, table, time_slot, **extra):
+        return {'table': table.id, 'date': self.day.isoformat(), 'time_slot': time_slot, 'guests_count': 2, **extra}
+
+    def test_overlapping_booking_is_a_conflict(self):
+        self.book(self.table, time(19))
+
+        response = self.client.post('/api/reservations/', {
+            'restaurant': self.restaurant.id, 'table': self.table.id,
+            'date': self.day.isoformat(), 'time_slot': '20:00', 'guests_count': 2
+        }, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_bulk_books_every_table(self):
+        response = self.client.post('/api/reservations/bulk/', {
+            'restaurant': self.restaurant.id,
+            'reservations': [self.item(self.table, '19:00'), self.item(self.other, '19:00')],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Reservation.objects.filter(status=ReservationStatus.PENDING).count(), 2)
+
+    def test_bulk_with_an_invalid_item_books_nothing(self):
+        self.book(self.table, time(19))
+
+        response = self.client.post('/api/reservations/bulk/', {
+            'restaurant': self.restaurant.id,
+            'reservations': [
+                self.item(self.other, '19:00'),
+                self.item(self.table, '20:00'),
+                self.item(self.other, '19:30'),
+                self.item(self.other, '21:00', guests_count=6),
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['reservations']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]['table'], ['This table is already reserved for this time slot'])
+        self.assertEqual(errors[2]['table'], ['Overlaps another reservation in this batch'])
+        self.assertIn('guests_count', errors[3])
+        self.assertEqual(Reservation.objects.count(), 1)
@@ -1,16 +1,22 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 
-from .models import Reservation, ReservationStatus
+from .export import ndjson_lines, csv_lines
+from .models import Reservation, ReservationStatus, Waitlist, WaitlistStatus
 from .serializers import (
     ReservationSerializer,
     ReservationCreateSerializer,
+    ReservationBulkCreateSerializer,
     ReservationUpdateSerializer,
     ReservationListSerializer,
     ReservationStatusUpdateSerializer,
+    WaitlistSerializer,
+    WaitlistJoinSerializer,
 )
+from core.pagination import ReservationPagination
 from core.permissions import IsReservationParticipant
 
 
@@ -18,14 +24,19 @@ class ReservationViewSet(viewsets.GenericViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
     permission_classes = [permissions.IsAuthenticated, IsReservationParticipant]
+    pagination_class = ReservationPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
             return ReservationCreateSerializer
+        elif self.action == 'bulk':
+            return ReservationBulkCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return ReservationUpdateSerializer
         elif self.action == 'update_status':
             return ReservationStatusUpdateSerializer
+        elif self.action == 'waitlist':
+            return WaitlistJoinSerializer if self.request.method == 'POST' else WaitlistSerializer
         elif self.action == 'list':
             return ReservationListSerializer
         return ReservationSerializer
@@ -41,7 +52,7 @@ class ReservationViewSet(viewsets.GenericViewSet):
         elif not user.is_admin_user:
             queryset = queryset.filter(user=user)
         
-        if self.action == 'list':
+        if self.action in ['list', 'export']:
             status_filter = self.request.query_params.get('status', None)
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
@@ -61,9 +72,9 @@ class ReservationViewSet(viewsets.GenericViewSet):
     
     def list(self, request, *args, **kwargs):
         """GET /api/reservations/ - список бронирований"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     def retrieve(self, request, *args, **kwargs):
         """GET /api/reservations/<id>/ - детали бронирования"""
@@ -78,6 +89,20 @@ class ReservationViewSet(viewsets.GenericViewSet):
         serializer.save(user=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST /api/reservations/bulk/ - групповое бронирование столиков (всё или ничего)
+        Body: {"restaurant": 1, "reservations": [{"table": 5, "date": "...", "time_slot": "19:00", "guests_count": 4}, ...]}
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reservations = serializer.save()
+        return Response(
+            ReservationListSerializer(reservations, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+    
     def update(self, request, *args, **kwargs):
         """PUT /api/reservations/<id>/ - полное обновление"""
         instance = self.get_object()
@@ -111,7 +136,10 @@ class ReservationViewSet(viewsets.GenericViewSet):
                 'error': 'Reservation is already cancelled.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        instance.cancel()
+        if not instance.cancel():
+            return Response({
+                'error': 'Reservation can no longer be cancelled.'
+            }, status=status.HTTP_409_CONFLICT)
         
         return Response({
             'detail': 'Reservation cancelled successfully.'
@@ -177,6 +205,32 @@ class ReservationViewSet(viewsets.GenericViewSet):
         serializer = ReservationListSerializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        GET /api/reservations/export/?output=ndjson|csv - потоковая выгрузка бронирований
+        Поддерживает те же фильтры, что и список.
+        """
+        user = request.user
+        if not (user.is_owner or user.is_admin_user):
+            return Response({
+                'error': 'Only restaurant owners and admins can export reservations.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response({
+                'error': 'output must be "ndjson" or "csv".'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.get_queryset()
+        if output == 'csv':
+            response = StreamingHttpResponse(csv_lines(queryset), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(ndjson_lines(queryset), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="reservations.{output}"'
+        return response
+    
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """
@@ -186,7 +240,7 @@ class ReservationViewSet(viewsets.GenericViewSet):
         instance = self.get_object()
         user = request.user
         
-        if not (instance.restaurant.owner == user or user.is_admin_user):
+        if not (instance.restaurant.owner_id == user.id or user.is_admin_user):
             return Response({
                 'error': 'Only restaurant owner or admin can update reservation status.'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -199,3 +253,43 @@ class ReservationViewSet(viewsets.GenericViewSet):
             'detail': 'Reservation status updated successfully.',
             'reservation': ReservationSerializer(instance).data
         }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get', 'post'])
+    def waitlist(self, request):
+        """
+        GET /api/reservations/waitlist/ - мои записи в листе ожидания
+        POST /api/reservations/waitlist/ - встать в лист ожидания
+        Body: {"restaurant": 1, "date": "2024-01-15", "time_slot": "19:00", "guests_count": 4}
+        """
+        if request.method == 'GET':
+            queryset = Waitlist.objects.filter(
+                user=request.user
+            ).select_related('restaurant').order_by('-date', '-time_slot', '-id')
+            page = self.paginate_queryset(queryset)
+            serializer = WaitlistSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entry = serializer.save()
+        return Response(WaitlistSerializer(entry).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['delete'], url_path=r'waitlist/(?P<entry_id>[0-9]+)')
+    def leave_waitlist(self, request, entry_id=None):
+        """
+        DELETE /api/reservations/waitlist/<id>/ - покинуть лист ожидания
+        """
+        updated = Waitlist.objects.filter(
+            pk=entry_id,
+            user=request.user,
+            status=WaitlistStatus.WAITING
+        ).update(status=WaitlistStatus.CANCELLED, updated_at=timezone.now())
+        
+        if not updated:
+            return Response({
+                'error': 'Waitlist entry not found.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'detail': 'Removed from the waitlist.'
+        }, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Restaurant, Table, Dish
+from .models import Restaurant, Table, Dish, DemandForecast
 
 
 class TableInline(admin.TabularInline):
@@ -19,7 +19,7 @@ class RestaurantAdmin(admin.ModelAdmin):
     list_display = ['name', 'city', 'cuisine_type', 'owner', 'average_rating', 'is_active', 'created_at']
     list_filter = ['cuisine_type', 'city', 'is_active', 'created_at']
     search_fields = ['name', 'city', 'address', 'owner__email']
-    readonly_fields = ['average_rating', 'total_reviews', 'created_at', 'updated_at']
+    readonly_fields = ['average_rating', 'total_reviews', 'rating_sum', 'created_at', 'updated_at']
     inlines = [TableInline, DishInline]
     
     fieldsets = (
@@ -33,10 +33,10 @@ class RestaurantAdmin(admin.ModelAdmin):
             'fields': ('address', 'city', 'latitude', 'longitude')
         }),
         ('Operating Hours', {
-            'fields': ('opening_time', 'closing_time')
+            'fields': ('opening_time', 'closing_time', 'reservation_duration')
         }),
         ('Ratings', {
-            'fields': ('average_rating', 'total_reviews')
+            'fields': ('average_rating', 'total_reviews', 'rating_sum')
         }),
         ('Status', {
             'fields': ('is_active',)
@@ -80,3 +80,11 @@ class DishAdmin(admin.ModelAdmin):
         }),
     )
 
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = ['id', 'restaurant', 'date', 'hour', 'expected_covers', 'generated_at']
+    list_filter = ['date', 'restaurant']
+    readonly_fields = ['generated_at']
+    date_hierarchy = 'date'
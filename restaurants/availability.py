@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.core.cache import cache
+from django.db.models import (
+    Count, DurationField, Exists, ExpressionWrapper, Func, OuterRef, Subquery, Value
+)
+
+from core.cache import versioned_key
+from reservations.models import (
+    Reservation, ACTIVE_STATUSES, reservation_day_family, reservation_period
+)
+from .models import Table
+
+
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+def tables_family(restaurant_id):
+    """Cache family bumped whenever a restaurant's tables change."""
+    return f'tables:{restaurant_id}'
+
+
+def seating_period(date, time_slot, duration):
+    """
+    Range a new seating at ``time_slot`` would occupy.
+
+    ``duration`` is either minutes or an expression yielding minutes per row,
+    e.g. the restaurant's ``reservation_duration`` in a correlated query.
+    """
+    if isinstance(duration, int):
+        return reservation_period(date, time_slot, duration)
+    start = reservation_period(date, time_slot, 0).lower
+    length = ExpressionWrapper(duration * Value(timedelta(minutes=1)), output_field=DurationField())
+    return TsTzRange(Value(start), Value(start) + length)
+
+
+def free_tables(restaurant_id, date, time_slot, guests_count, duration):
+    """
+    Tables that seat ``guests_count`` and have no active booking overlapping
+    a ``duration``-minute seating from ``time_slot``.
+
+    A single query: the capacity/availability filter plus a NOT EXISTS
+    anti-join answered by the (table, period) exclusion index of the
+    partitions around ``date``. Smallest
+    fitting tables first. ``restaurant_id`` may be an ``OuterRef`` to
+    correlate with restaurants.
+    """
+    # Only bookings from the day before to the day after can overlap; the
+    # date bound lets Postgres prune every other reservation partition.
+    booked = Reservation.objects.filter(
+        table=OuterRef('pk'),
+        date__range=(date - timedelta(days=1), date + timedelta(days=1)),
+        period__overlap=seating_period(date, time_slot, duration),
+        status__in=ACTIVE_STATUSES
+    )
+    return Table.objects.filter(
+        restaurant_id=restaurant_id,
+        is_available=True,
+        capacity__gte=guests_count
+    ).filter(
+        ~Exists(booked)
+    ).order_by('capacity', 'table_number')
+
+
+def available_tables(restaurant_id, date, time_slot, guests_count, duration):
+    """
+    Cached ``free_tables`` rows as plain dicts.
+
+    Entries live under the restaurant-day family, so any reservation change
+    for that day (or any table change) invalidates them.
+    """
+    key = versioned_key(
+        reservation_day_family(restaurant_id, date),
+        {'time': time_slot.isoformat(), 'guests': guests_count, 'duration': duration},
+        tags=[tables_family(restaurant_id)]
+    )
+    tables = cache.get(key)
+    if tables is None:
+        tables = list(
+            free_tables(restaurant_id, date, time_slot, guests_count, duration).values(
+                'id', 'table_number', 'capacity', 'location_in_restaurant'
+            )
+        )
+        cache.set(key, tables, timeout=60 * 60)
+    return tables
+
+
+def restaurants_with_free_tables(queryset, date, time_slot, guests_count):
+    """
+    Restaurants from ``queryset`` open at ``time_slot`` with at least one free
+    fitting table, annotated with ``free_tables``.
+
+    Filtering is a correlated EXISTS, so a whole city is answered by one
+    statement instead of one availability query per restaurant.
+    """
+    # The subquery on reservations sits two levels below the restaurant row.
+    tables = free_tables(
+        OuterRef('pk'), date, time_slot, guests_count,
+        duration=OuterRef(OuterRef('reservation_duration'))
+    )
+    free_count = tables.order_by().values('restaurant_id').annotate(
+        total=Count('pk')
+    ).values('total')
+
+    return queryset.filter(
+        is_active=True,
+        opening_time__lte=time_slot,
+        closing_time__gt=time_slot
+    ).filter(
+        Exists(tables)
+    ).annotate(
+        free_tables=Subquery(free_count)
+    )
@@ -0,0 +1,91 @@
+from collections import Counter
+from datetime import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.cache import versioned_key
+from reservations.models import Reservation, ReservationStatus, ACTIVE_STATUSES, reservation_day_family
+from reservations.occupancy import get_occupancy
+from .availability import tables_family
+from .models import Table
+
+
+DASHBOARD_TIMEOUT = 60 * 60
+
+# Statuses whose guests count towards covers.
+SEATED_STATUSES = [*ACTIVE_STATUSES, ReservationStatus.COMPLETED]
+
+
+def build_dashboard(restaurant, date):
+    """
+    The day at a glance: bookings in time order, status counts, and per
+    opening hour the covers booked and the tables with no booking in it.
+
+    Free tables come from the day's occupancy row, so the whole document
+    costs three queries however busy the day is.
+    """
+    timeline = list(
+        Reservation.objects.filter(
+            restaurant=restaurant,
+            date=date
+        ).order_by('time_slot', 'table__table_number').values(
+            'id', 'time_slot', 'duration', 'guests_count', 'status',
+            'special_requests', 'table_id', 'table__table_number',
+            'user__first_name', 'user__last_name', 'user__phone'
+        )
+    )
+    for row in timeline:
+        row['user__phone'] = str(row['user__phone'] or '')
+    table_ids = list(
+        Table.objects.filter(restaurant=restaurant, is_available=True).values_list('id', flat=True)
+    )
+    occupancy = get_occupancy(restaurant.id, date)
+
+    status_counts = dict.fromkeys(ReservationStatus.values, 0)
+    status_counts.update(Counter(row['status'] for row in timeline))
+
+    covers = Counter()
+    for row in timeline:
+        if row['status'] in SEATED_STATUSES:
+            covers[row['time_slot'].hour] += row['guests_count']
+
+    last_hour = restaurant.closing_time.hour - (restaurant.closing_time.minute == 0)
+    hours = []
+    for hour in range(restaurant.opening_time.hour, last_hour + 1):
+        hours.append({
+            'hour': f'{hour:02d}:00',
+            'covers': covers[hour],
+            'free_tables': sum(1 for table_id in table_ids if occupancy.is_free(table_id, time(hour), 60)),
+        })
+
+    return {
+        'restaurant_id': restaurant.id,
+        'date': date.isoformat(),
+        'status_counts': status_counts,
+        'covers': sum(covers.values()),
+        'tables': len(table_ids),
+        'hours': hours,
+        'timeline': timeline,
+        'generated_at': timezone.now(),
+    }
+
+
+def get_dashboard(restaurant, date):
+    """
+    Cached ``build_dashboard``.
+
+    The document lives under the restaurant-day family, so it is rebuilt
+    only after a reservation of that day, a table or the restaurant itself
+    changes; refreshing it during service is a single cache read.
+    """
+    key = versioned_key(
+        reservation_day_family(restaurant.id, date),
+        {'view': 'dashboard'},
+        tags=[tables_family(restaurant.id), f'restaurant:{restaurant.id}']
+    )
+    document = cache.get(key)
+    if document is None:
+        document = build_dashboard(restaurant, date)
+        cache.set(key, document, timeout=DASHBOARD_TIMEOUT)
+    return document
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+HORIZON_WEEKS = 4
+WINDOW_WEEKS = 4
+# The moving average never looks further back than its window.
+HISTORY_WEEKS = WINDOW_WEEKS
+
+
+def covers_grid(restaurant_ids, dates, hours, covers, start, weeks=HISTORY_WEEKS):
+    """
+    Scatter ``(restaurant, date, hour, covers)`` columns into a dense
+    ``restaurants x weeks x day-of-week x hour`` array.
+
+    Weeks are counted from ``start``, so day-of-week 0 is ``start``'s
+    weekday. Returns the sorted unique restaurant ids and the grid.
+    """
+    ids, restaurant_index = np.unique(np.asarray(restaurant_ids), return_inverse=True)
+    days = (np.asarray(dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+
+    grid = np.zeros((len(ids), weeks, 7, 24))
+    np.add.at(
+        grid,
+        (restaurant_index, days // 7, days % 7, np.asarray(hours, dtype=np.int64)),
+        np.asarray(covers, dtype=np.float64)
+    )
+    return ids, grid
+
+
+def seasonal_moving_average(grid, horizon=HORIZON_WEEKS, window=WINDOW_WEEKS):
+    """
+    Forecast the next ``horizon`` weeks of a ``... x weeks x 7 x 24`` grid.
+
+    Each day-of-week/hour cell is forecast as the mean of the same cell in
+    the previous ``window`` weeks; later weeks roll forward over earlier
+    forecasts. Every step works on all restaurants at once.
+    """
+    history = grid[:, -window:]
+    forecasts = []
+    for _ in range(horizon):
+        week = history.mean(axis=1)
+        forecasts.append(week)
+        history = np.concatenate([history[:, 1:], week[:, np.newaxis]], axis=1)
+    return np.stack(forecasts, axis=1)
@@ -0,0 +1,74 @@
+import math
+
+from django.db.models import ExpressionWrapper, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return ``(min_lat, max_lat, min_lng, max_lng)`` enclosing the circle."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        delta_lng = 180.0
+    else:
+        delta_lng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(lat - delta_lat, -90.0),
+        min(lat + delta_lat, 90.0),
+        lng - delta_lng,
+        lng + delta_lng,
+    )
+
+
+def within_bounding_box(lat, lng, radius_km):
+    """
+    Prefilter on the indexed latitude/longitude columns.
+
+    Boxes crossing the antimeridian are split into two longitude ranges.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    condition = Q(latitude__range=(round(min_lat, 6), round(max_lat, 6)))
+
+    if max_lng - min_lng >= 360:
+        return condition & Q(longitude__isnull=False)
+    if min_lng < -180:
+        return condition & (Q(longitude__gte=round(min_lng + 360, 6)) | Q(longitude__lte=round(max_lng, 6)))
+    if max_lng > 180:
+        return condition & (Q(longitude__gte=round(min_lng, 6)) | Q(longitude__lte=round(max_lng - 360, 6)))
+    return condition & Q(longitude__range=(round(min_lng, 6), round(max_lng, 6)))
+
+
+def haversine_distance(lat, lng):
+    """Great-circle distance in kilometres from ``(lat, lng)``, as a query expression."""
+    origin_lat = math.radians(lat)
+    row_lat = Radians(Cast('latitude', FloatField()))
+    delta_lat = row_lat - Value(origin_lat)
+    delta_lng = Radians(Cast('longitude', FloatField())) - Value(math.radians(lng))
+
+    a = (
+        Power(Sin(delta_lat / Value(2.0)), 2)
+        + Value(math.cos(origin_lat)) * Cos(row_lat) * Power(Sin(delta_lng / Value(2.0)), 2)
+    )
+    return ExpressionWrapper(
+        Value(2.0 * EARTH_RADIUS_KM) * ASin(Sqrt(a)),
+        output_field=FloatField()
+    )
+
+
+def nearby(queryset, lat, lng, radius_km):
+    """
+    Restaurants within ``radius_km`` of the point, nearest first.
+
+    The bounding box narrows the scan to an index range; the exact distance
+    is only evaluated for the rows inside it.
+    """
+    return queryset.filter(
+        within_bounding_box(lat, lng, radius_km)
+    ).annotate(
+        distance=haversine_distance(lat, lng)
+    ).filter(
+        distance__lte=radius_km
+    ).order_by('distance', 'id')
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0003_dish"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="restaurants_latitud_bcb1fb_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def populate_search_vector(apps, schema_editor):
+    from django.contrib.postgres.search import SearchVector
+
+    Restaurant = apps.get_model("restaurants", "Restaurant")
+    Restaurant.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config="russian")
+            + SearchVector("name", weight="A", config="english")
+            + SearchVector("description", weight="B", config="russian")
+            + SearchVector("description", weight="B", config="english")
+            + SearchVector("address", "city", weight="C", config="simple")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0004_restaurant_location_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                help_text="Full-text search document, maintained on save",
+                null=True,
+                verbose_name="search vector",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="restaurants_search__7209fa_gin"
+            ),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
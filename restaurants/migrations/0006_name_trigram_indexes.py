@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:09
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0005_restaurant_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="dish",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="dish_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="restaurant_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:14
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0006_name_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="reservation_duration",
+            field=models.PositiveSmallIntegerField(
+                default=120,
+                help_text="Default seating length in minutes",
+                validators=[
+                    django.core.validators.MinValueValidator(15),
+                    django.core.validators.MaxValueValidator(720),
+                ],
+                verbose_name="reservation duration",
+            ),
+        ),
+    ]
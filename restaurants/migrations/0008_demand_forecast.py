@@ -0,0 +1,74 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:23
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0007_reservation_duration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DemandForecast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(help_text="Forecast date", verbose_name="date"),
+                ),
+                (
+                    "hour",
+                    models.PositiveSmallIntegerField(
+                        help_text="Hour of day the covers arrive in",
+                        validators=[django.core.validators.MaxValueValidator(23)],
+                        verbose_name="hour",
+                    ),
+                ),
+                (
+                    "expected_covers",
+                    models.FloatField(
+                        help_text="Expected number of guests",
+                        verbose_name="expected covers",
+                    ),
+                ),
+                (
+                    "generated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="generated at"),
+                ),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        help_text="Restaurant",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="forecasts",
+                        to="restaurants.restaurant",
+                        verbose_name="restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "demand forecast",
+                "verbose_name_plural": "demand forecasts",
+                "ordering": ["date", "hour"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="demandforecast",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "date", "hour"),
+                name="demand_forecast_restaurant_date_hour",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:29
+
+from django.db import migrations, models
+
+
+def populate_rating_totals(apps, schema_editor):
+    schema_editor.execute(
+        "UPDATE restaurants_restaurant AS r "
+        "SET rating_sum = stats.rating_sum, total_reviews = stats.total, "
+        "average_rating = round(stats.rating_sum::numeric / stats.total, 2) "
+        "FROM (SELECT restaurant_id, sum(rating) AS rating_sum, count(*) AS total "
+        "FROM reviews_review GROUP BY restaurant_id) AS stats "
+        "WHERE stats.restaurant_id = r.id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0008_demand_forecast"),
+        ("reviews", "0003_reservation_without_db_constraint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Sum of all review ratings",
+                verbose_name="rating sum",
+            ),
+        ),
+        migrations.RunPython(populate_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+def populate_rating_counts(apps, schema_editor):
+    schema_editor.execute(
+        "UPDATE restaurants_restaurant AS r "
+        "SET rating_count_1 = stats.c1, rating_count_2 = stats.c2, rating_count_3 = stats.c3, "
+        "rating_count_4 = stats.c4, rating_count_5 = stats.c5 "
+        "FROM (SELECT restaurant_id, "
+        "count(*) FILTER (WHERE rating = 1) AS c1, count(*) FILTER (WHERE rating = 2) AS c2, "
+        "count(*) FILTER (WHERE rating = 3) AS c3, count(*) FILTER (WHERE rating = 4) AS c4, "
+        "count(*) FILTER (WHERE rating = 5) AS c5 "
+        "FROM reviews_review GROUP BY restaurant_id) AS stats "
+        "WHERE stats.restaurant_id = r.id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0009_rating_sum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_1",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of 1-star reviews",
+                verbose_name="1-star reviews",
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_2",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of 2-star reviews",
+                verbose_name="2-star reviews",
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_3",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of 3-star reviews",
+                verbose_name="3-star reviews",
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_4",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of 4-star reviews",
+                verbose_name="4-star reviews",
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="rating_count_5",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of 5-star reviews",
+                verbose_name="5-star reviews",
+            ),
+        ),
+        migrations.RunPython(populate_rating_counts, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models, transaction
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from phonenumber_field.modelfields import PhoneNumberField
@@ -19,7 +24,46 @@ class CuisineType(models.TextChoices):
     OTHER = 'other', 'Другая'
 
 
+def restaurant_search_vector():
+    # Most of the catalogue is Russian, but names and descriptions mix in
+    # English, so both stemmers contribute; addresses are matched verbatim.
+    return (
+        SearchVector('name', weight='A', config='russian')
+        + SearchVector('name', weight='A', config='english')
+        + SearchVector('description', weight='B', config='russian')
+        + SearchVector('description', weight='B', config='english')
+        + SearchVector('address', 'city', weight='C', config='simple')
+    )
+
+
+# Review histogram counters kept on the restaurant row, by star rating.
+RATING_COUNT_FIELDS = {rating: f'rating_count_{rating}' for rating in range(1, 6)}
+RATING_STATS_FIELDS = ['id', 'total_reviews', 'average_rating', *RATING_COUNT_FIELDS.values()]
+
+
+def average_rating_expression(rating_sum, total_reviews):
+    """Average from rating totals in SQL; 0 for a restaurant without reviews."""
+    return Coalesce(
+        Cast(rating_sum, models.DecimalField(max_digits=12, decimal_places=4)) / NullIf(total_reviews, 0),
+        models.Value(Decimal('0'))
+    )
+
+
+class RestaurantQuerySet(models.QuerySet):
+    def with_tables(self):
+        """Load tables and their count up front for RestaurantSerializer."""
+        return self.annotate(
+            tables_count=models.Count('tables')
+        ).prefetch_related(
+            # Table.Meta.ordering starts with 'restaurant', which would join
+            # back to restaurants and order by their rating.
+            models.Prefetch('tables', queryset=Table.objects.order_by('table_number'))
+        )
+
+
 class Restaurant(models.Model):
+    SEARCH_FIELDS = {'name', 'description', 'address', 'city'}
+    
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -92,6 +136,12 @@ class Restaurant(models.Model):
         'closing time',
         help_text='Restaurant closing time'
     )
+    reservation_duration = models.PositiveSmallIntegerField(
+        'reservation duration',
+        default=120,
+        validators=[MinValueValidator(15), MaxValueValidator(720)],
+        help_text='Default seating length in minutes'
+    )
     
     average_rating = models.DecimalField(
         'average rating',
@@ -106,6 +156,36 @@ class Restaurant(models.Model):
         default=0,
         help_text='Total number of reviews'
     )
+    rating_sum = models.PositiveIntegerField(
+        'rating sum',
+        default=0,
+        help_text='Sum of all review ratings'
+    )
+    rating_count_1 = models.PositiveIntegerField(
+        '1-star reviews',
+        default=0,
+        help_text='Number of 1-star reviews'
+    )
+    rating_count_2 = models.PositiveIntegerField(
+        '2-star reviews',
+        default=0,
+        help_text='Number of 2-star reviews'
+    )
+    rating_count_3 = models.PositiveIntegerField(
+        '3-star reviews',
+        default=0,
+        help_text='Number of 3-star reviews'
+    )
+    rating_count_4 = models.PositiveIntegerField(
+        '4-star reviews',
+        default=0,
+        help_text='Number of 4-star reviews'
+    )
+    rating_count_5 = models.PositiveIntegerField(
+        '5-star reviews',
+        default=0,
+        help_text='Number of 5-star reviews'
+    )
     
     is_active = models.BooleanField(
         'active',
@@ -113,9 +193,18 @@ class Restaurant(models.Model):
         help_text='Is restaurant active and accepting reservations'
     )
     
+    search_vector = SearchVectorField(
+        'search vector',
+        null=True,
+        editable=False,
+        help_text='Full-text search document, maintained on save'
+    )
+    
     created_at = models.DateTimeField('created at', auto_now_add=True)
     updated_at = models.DateTimeField('updated at', auto_now=True)
     
+    objects = RestaurantQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'restaurant'
         verbose_name_plural = 'restaurants'
@@ -127,25 +216,102 @@ class Restaurant(models.Model):
             models.Index(fields=['average_rating']),
             models.Index(fields=['is_active']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['latitude', 'longitude']),
+            GinIndex(fields=['search_vector']),
+            GinIndex(fields=['name'], name='restaurant_name_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
         return f"{self.name} ({self.city})"
     
-    def update_rating(self):
-        from reviews.models import Review
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
         
-        reviews = Review.objects.filter(restaurant=self)
-        self.total_reviews = reviews.count()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.SEARCH_FIELDS.intersection(update_fields):
+            Restaurant.objects.filter(pk=self.pk).update(
+                search_vector=restaurant_search_vector()
+            )
+    
+    @classmethod
+    def apply_rating_change(cls, restaurant_id, removed=None, added=None):
+        """
+        Move a restaurant's rating totals and histogram by one review change
+        in a single UPDATE.
+
+        ``removed`` is the rating that stops counting and ``added`` the one
+        that starts (either may be None: a new review only adds, a deleted
+        one only removes). Deltas are applied with ``F()`` expressions, so
+        concurrent review writes add up instead of overwriting each other
+        and no review row is read. Call it in the transaction that writes
+        the review.
+        """
+        if removed == added:
+            return
         
-        if self.total_reviews > 0:
-            total_rating = sum(review.rating for review in reviews)
-            self.average_rating = total_rating / self.total_reviews
-        else:
-            self.average_rating = 0.0
+        changes = {}
+        for rating, step in ((removed, -1), (added, 1)):
+            if rating is not None:
+                field = RATING_COUNT_FIELDS[rating]
+                changes[field] = changes.get(field, models.F(field)) + step
         
-        self.save(update_fields=['average_rating', 'total_reviews'])
+        rating_sum = models.F('rating_sum') + (added or 0) - (removed or 0)
+        total_reviews = models.F('total_reviews') + int(added is not None) - int(removed is not None)
+        cls.objects.filter(pk=restaurant_id).update(
+            rating_sum=rating_sum,
+            total_reviews=total_reviews,
+            average_rating=average_rating_expression(rating_sum, total_reviews),
+            **changes
+        )
+    
+    def update_rating(self):
+        """
+        Recompute rating totals and histogram from the reviews themselves.
 
+        Only the nightly repair needs this. The restaurant row stays locked
+        while the reviews are aggregated, so a concurrent delta is applied
+        on top of the recomputed totals rather than lost.
+        """
+        from reviews.models import Review
+        
+        with transaction.atomic():
+            Restaurant.objects.select_for_update().filter(pk=self.pk).values_list('pk').first()
+            stats = Review.objects.filter(restaurant_id=self.pk).aggregate(
+                rating_sum=Coalesce(models.Sum('rating'), 0),
+                total=models.Count('id'),
+                **{
+                    field: models.Count('id', filter=models.Q(rating=rating))
+                    for rating, field in RATING_COUNT_FIELDS.items()
+                }
+            )
+            self.rating_sum = stats.pop('rating_sum')
+            self.total_reviews = stats.pop('total')
+            for field, count in stats.items():
+                setattr(self, field, count)
+            if self.total_reviews > 0:
+                self.average_rating = (Decimal(self.rating_sum) / self.total_reviews).quantize(
+                    Decimal('0.01'), rounding=ROUND_HALF_UP
+                )
+            else:
+                self.average_rating = Decimal('0')
+            Restaurant.objects.filter(pk=self.pk).update(
+                rating_sum=self.rating_sum,
+                total_reviews=self.total_reviews,
+                average_rating=self.average_rating,
+                **stats
+            )
+    
+    def rating_stats(self):
+        """Review statistics of the restaurant, read from its own row."""
+        return {
+            'restaurant_id': self.pk,
+            'total_reviews': self.total_reviews,
+            'average_rating': float(self.average_rating),
+            'rating_distribution': {
+                str(rating): getattr(self, field)
+                for rating, field in sorted(RATING_COUNT_FIELDS.items(), reverse=True)
+            },
+        }
 
 class TableLocation(models.TextChoices):
     MAIN_HALL = 'main_hall', 'Основной зал'
@@ -302,8 +468,44 @@ class Dish(models.Model):
             models.Index(fields=['is_vegetarian']),
             models.Index(fields=['is_vegan']),
             models.Index(fields=['created_at']),
+            GinIndex(fields=['name'], name='dish_name_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
         return f"{self.name} - {self.restaurant.name} ({self.price} руб.)"
 
+
+
+class DemandForecast(models.Model):
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='forecasts',
+        verbose_name='restaurant',
+        help_text='Restaurant'
+    )
+    date = models.DateField(
+        'date',
+        help_text='Forecast date'
+    )
+    hour = models.PositiveSmallIntegerField(
+        'hour',
+        validators=[MaxValueValidator(23)],
+        help_text='Hour of day the covers arrive in'
+    )
+    expected_covers = models.FloatField(
+        'expected covers',
+        help_text='Expected number of guests'
+    )
+    generated_at = models.DateTimeField('generated at', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'demand forecast'
+        verbose_name_plural = 'demand forecasts'
+        ordering = ['date', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'date', 'hour'], name='demand_forecast_restaurant_date_hour'),
+        ]
+    
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.date} {self.hour:02d}:00 - {self.expected_covers:.1f}"
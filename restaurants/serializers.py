@@ -1,5 +1,9 @@
+from datetime import timedelta
+
 from rest_framework import serializers
+from django.utils import timezone
 from .models import Restaurant, Table, Dish, CuisineType, TableLocation, DishCategory
+from .availability import available_tables
 from users.serializers import UserMinimalSerializer
 
 
@@ -38,7 +42,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
             'id', 'owner', 'name', 'description', 'cuisine_type',
             'phone', 'email', 'address', 'city',
             'latitude', 'longitude',
-            'opening_time', 'closing_time',
+            'opening_time', 'closing_time', 'reservation_duration',
             'average_rating', 'total_reviews',
             'is_active', 'tables', 'tables_count',
             'created_at', 'updated_at'
@@ -49,6 +53,8 @@ class RestaurantSerializer(serializers.ModelSerializer):
         ]
     
     def get_tables_count(self, obj):
+        if hasattr(obj, 'tables_count'):
+            return obj.tables_count
         return obj.tables.count()
     
     def validate(self, attrs):
@@ -84,7 +90,7 @@ class RestaurantCreateSerializer(serializers.ModelSerializer):
             'name', 'description', 'cuisine_type',
             'phone', 'email', 'address', 'city',
             'latitude', 'longitude',
-            'opening_time', 'closing_time'
+            'opening_time', 'closing_time', 'reservation_duration'
         ]
     
     def validate(self, attrs):
@@ -106,7 +112,7 @@ class RestaurantUpdateSerializer(serializers.ModelSerializer):
             'name', 'description', 'cuisine_type',
             'phone', 'email', 'address', 'city',
             'latitude', 'longitude',
-            'opening_time', 'closing_time', 'is_active'
+            'opening_time', 'closing_time', 'reservation_duration', 'is_active'
         ]
 
 
@@ -121,6 +127,13 @@ class RestaurantListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class RestaurantAvailabilitySerializer(RestaurantListSerializer):
+    free_tables = serializers.IntegerField(read_only=True)
+    
+    class Meta(RestaurantListSerializer.Meta):
+        fields = RestaurantListSerializer.Meta.fields + ['address', 'free_tables']
+
+
 class RestaurantSearchSerializer(serializers.ModelSerializer):    
     distance = serializers.FloatField(read_only=True, required=False)
     
@@ -134,6 +147,18 @@ class RestaurantSearchSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class NearbySearchSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(required=False, default=5, min_value=0.1, max_value=50)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=100, trim_whitespace=True)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=20)
+
+
 class TableCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
@@ -153,14 +178,64 @@ class AvailableTablesSerializer(serializers.Serializer):
     date = serializers.DateField(required=True)
     time_slot = serializers.TimeField(required=True)
     guests_count = serializers.IntegerField(required=True, min_value=1, max_value=20)
+    duration = serializers.IntegerField(required=False, min_value=15, max_value=720)
     
     def validate(self, attrs):
-        from django.utils import timezone
         if attrs['date'] < timezone.now().date():
             raise serializers.ValidationError({
                 'date': 'Date cannot be in the past'
             })
         
+        restaurant = self.context['restaurant']
+        attrs.setdefault('duration', restaurant.reservation_duration)
+        if not restaurant.is_active:
+            raise serializers.ValidationError({
+                'restaurant': 'This restaurant is not accepting reservations'
+            })
+        
+        if attrs['time_slot'] < restaurant.opening_time or attrs['time_slot'] >= restaurant.closing_time:
+            raise serializers.ValidationError({
+                'time_slot': f'Time must be between {restaurant.opening_time} and {restaurant.closing_time}'
+            })
+        
+        return attrs
+    
+    def get_available_tables(self):
+        return available_tables(self.context['restaurant'].id, **self.validated_data)
+
+
+class AvailabilitySearchSerializer(serializers.Serializer):
+    city = serializers.CharField(max_length=100)
+    date = serializers.DateField()
+    time = serializers.TimeField()
+    party = serializers.IntegerField(min_value=1, max_value=20)
+    cuisine = serializers.ChoiceField(choices=CuisineType.choices, required=False)
+    
+    def validate_date(self, value):
+        if value < timezone.now().date():
+            raise serializers.ValidationError('Date cannot be in the past')
+        return value
+
+
+class DashboardSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        attrs.setdefault('date', timezone.localdate())
+        return attrs
+
+
+class ForecastSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        attrs.setdefault('date_from', timezone.localdate())
+        attrs.setdefault('date_to', attrs['date_from'] + timedelta(days=27))
+        if attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError({
+                'date_to': 'date_to must not be before date_from'
+            })
         return attrs
 
 
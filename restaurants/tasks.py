@@ -1,10 +1,20 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db.models import Count, Avg
+from django.db import transaction
+from django.db.models import Count, Avg, Sum
+from django.db.models.functions import ExtractHour
 from django.utils import timezone
 
 
+logger = logging.getLogger(__name__)
+
+
 @shared_task(name='restaurants.tasks.generate_restaurant_report')
 def generate_restaurant_report(restaurant_id):
     from .models import Restaurant
@@ -39,3 +49,95 @@ def generate_restaurant_report(restaurant_id):
         return f"Report sent to {restaurant.owner.email}"
     except Exception as e:
         return str(e)
+
+
+@shared_task(name='restaurants.tasks.forecast_demand')
+def forecast_demand():
+    """
+    Recompute covers forecasts for the next weeks for every restaurant.
+
+    History is aggregated to (restaurant, date, hour) in SQL and forecast
+    with NumPy over all restaurants at once; the only Python loop left
+    builds the rows for the final bulk insert.
+    """
+    from .forecast import HISTORY_WEEKS, covers_grid, seasonal_moving_average
+    from .models import DemandForecast
+    from reservations.models import Reservation, ReservationStatus
+
+    today = timezone.localdate()
+    start = today - timedelta(weeks=HISTORY_WEEKS)
+
+    rows = list(
+        Reservation.objects.filter(
+            date__gte=start,
+            date__lt=today
+        ).exclude(
+            status=ReservationStatus.CANCELLED
+        ).annotate(
+            hour=ExtractHour('time_slot')
+        ).values('restaurant_id', 'date', 'hour').annotate(
+            covers=Sum('guests_count')
+        ).order_by().values_list('restaurant_id', 'date', 'hour', 'covers')
+    )
+
+    forecasts = []
+    if rows:
+        restaurant_ids, grid = covers_grid(*zip(*rows), start=start)
+        expected = seasonal_moving_average(grid).round(2)
+
+        restaurant_index, week, day, hour = np.nonzero(expected)
+        dates = np.datetime64(today, 'D') + week * 7 + day
+        forecasts = [
+            DemandForecast(restaurant_id=restaurant_id, date=date, hour=hour, expected_covers=covers)
+            for restaurant_id, date, hour, covers in zip(
+                restaurant_ids[restaurant_index].tolist(),
+                dates.tolist(),
+                hour.tolist(),
+                expected[restaurant_index, week, day, hour].tolist()
+            )
+        ]
+
+    with transaction.atomic():
+        DemandForecast.objects.filter(date__gte=today).delete()
+        DemandForecast.objects.bulk_create(forecasts, batch_size=5000)
+
+    return len(forecasts)
+
+
+@shared_task(name='restaurants.tasks.repair_restaurant_ratings')
+def repair_restaurant_ratings():
+    """
+    Reconcile rating totals and histograms kept by review deltas with the
+    reviews.
+
+    One grouped query over all reviews finds the restaurants whose counters
+    drifted (bulk or cascading deletes skip the deltas); only those are
+    recomputed and have their caches invalidated.
+    """
+    from core.cache import bump_generation
+    from .models import Restaurant, RATING_COUNT_FIELDS
+    from reviews.models import Review
+
+    actual = defaultdict(dict)
+    for row in Review.objects.order_by().values('restaurant_id', 'rating').annotate(total=Count('id')):
+        actual[row['restaurant_id']][RATING_COUNT_FIELDS[row['rating']]] = row['total']
+
+    fields = list(RATING_COUNT_FIELDS.values())
+    repaired = []
+    for restaurant in Restaurant.objects.only('id', 'rating_sum', 'total_reviews', *fields).iterator():
+        counts = actual.get(restaurant.id, {})
+        expected = [counts.get(field, 0) for field in fields]
+        expected_sum = sum(rating * counts.get(field, 0) for rating, field in RATING_COUNT_FIELDS.items())
+        stored = [getattr(restaurant, field) for field in fields]
+        if (
+            stored != expected
+            or restaurant.total_reviews != sum(expected)
+            or restaurant.rating_sum != expected_sum
+        ):
+            restaurant.update_rating()
+            repaired.append(restaurant.id)
+
+    if repaired:
+        bump_generation('restaurants:list', *(f'restaurant:{pk}' for pk in repaired))
+    logger.info('repair_restaurant_ratings repaired=%d', len(repaired))
+    return len(repaired)
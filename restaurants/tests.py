@@ -1,3 +1,54 @@
+from datetime import time
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from reviews.models import Review, ReviewEligibility
+from users.models import User
+from .models import Restaurant
+from .tasks import repair_restaurant_ratings
+
+
+class RepairRestaurantRatingsTests(TestCase):
+    """The nightly repair recomputes only the restaurants whose counters drifted."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            'owner@example.com', 'password', first_name='Owner', last_name='Test'
+        )
+        self.guest = User.objects.create_user(
+            'guest@example.com', 'password', first_name='Guest', last_name='Test'
+        )
+
+    def restaurant(self, name, *ratings):
+        restaurant = Restaurant.objects.create(
+            owner=self.owner, name=name, description='Test', cuisine_type='russian',
+            phone='+79161234567', email='r@example.com', address='Test', city='Москва',
+            opening_time=time(10), closing_time=time(23)
+        )
+        ReviewEligibility.objects.create(user=self.guest, restaurant=restaurant, completed_reservations=1)
+        for rating in ratings:
+            Review.objects.create(user=self.guest, restaurant=restaurant, rating=rating, comment='Test')
+        return restaurant
+
+    def test_drifted_counters_are_recomputed(self):
+        drifted = self.restaurant('Drifted', 4)
+        intact = self.restaurant('Intact', 5)
+        # A queryset delete skips the per-review deltas.
+        Review.objects.filter(restaurant=drifted).delete()
+
+        self.assertEqual(repair_restaurant_ratings(), 1)
+
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.total_reviews, 0)
+        self.assertEqual(drifted.rating_sum, 0)
+        self.assertEqual(drifted.rating_count_4, 0)
+        self.assertEqual(drifted.average_rating, Decimal('0'))
+        intact.refresh_from_db()
+        self.assertEqual(intact.total_reviews, 1)
+        self.assertEqual(intact.average_rating, Decimal('5.00'))
+
+    def test_consistent_counters_are_left_alone(self):
+        self.restaurant('Intact', 5)
+
+        self.assertEqual(repair_restaurant_ratings(), 0)
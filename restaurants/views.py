@@ -1,21 +1,30 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from django.db.models import Q
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
 from django.core.cache import cache
-from django.utils.http import urlencode
 
-from .models import Restaurant, Table, Dish
+from .models import Restaurant, Table, Dish, DemandForecast
+from .geo import nearby
+from .availability import tables_family, restaurants_with_free_tables
+from .dashboard import get_dashboard
 from .serializers import (
     RestaurantSerializer,
     RestaurantCreateSerializer,
     RestaurantUpdateSerializer,
     RestaurantListSerializer,
     RestaurantSearchSerializer,
+    NearbySearchSerializer,
+    AutocompleteSerializer,
     TableSerializer,
     TableCreateSerializer,
-    TableMinimalSerializer,
     AvailableTablesSerializer,
+    AvailabilitySearchSerializer,
+    DashboardSerializer,
+    ForecastSerializer,
+    RestaurantAvailabilitySerializer,
     DishSerializer,
     DishCreateSerializer,
     DishUpdateSerializer,
@@ -23,6 +32,8 @@ from .serializers import (
     DishSearchSerializer,
     DishMinimalSerializer
 )
+from core.cache import versioned_key, bump_generation
+from core.pagination import RestaurantPagination, RatingPagination, TablePagination, DishPagination
 from core.permissions import IsRestaurantOwnerOrReadOnly
 
 
@@ -30,13 +41,17 @@ class RestaurantViewSet(viewsets.GenericViewSet):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
     permission_classes = [IsRestaurantOwnerOrReadOnly]
+    pagination_class = RestaurantPagination
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'search']:
+        if self.action in [
+            'list', 'retrieve', 'search', 'nearby', 'autocomplete',
+            'available_tables', 'availability'
+        ]:
             return [permissions.AllowAny()]
         elif self.action == 'create':
             return [permissions.IsAuthenticated()]
-        elif self.action == 'my_restaurants':
+        elif self.action in ['my_restaurants', 'dashboard', 'forecast']:
             return [permissions.IsAuthenticated()]
         return [IsRestaurantOwnerOrReadOnly()]
     
@@ -47,14 +62,17 @@ class RestaurantViewSet(viewsets.GenericViewSet):
             return RestaurantUpdateSerializer
         elif self.action == 'list':
             return RestaurantListSerializer
-        elif self.action == 'search':
+        elif self.action in ['search', 'nearby']:
             return RestaurantSearchSerializer
         return RestaurantSerializer
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related('owner')
         
-        if self.action == 'list':
+        if self.action == 'retrieve':
+            queryset = queryset.with_tables()
+        
+        if self.action in ['list', 'nearby']:
             cuisine = self.request.query_params.get('cuisine', None)
             if cuisine:
                 queryset = queryset.filter(cuisine_type=cuisine)
@@ -62,35 +80,32 @@ class RestaurantViewSet(viewsets.GenericViewSet):
             min_rating = self.request.query_params.get('min_rating', None)
             if min_rating:
                 queryset = queryset.filter(average_rating__gte=float(min_rating))
-            
-            ordering = self.request.query_params.get('ordering', '-created_at')
-            queryset = queryset.order_by(ordering)
         
         return queryset
     
     def list(self, request, *args, **kwargs):
         """GET /api/restaurants/ - список ресторанов"""
-        params = request.query_params.dict()
-        key = 'restaurants:list:' + urlencode(sorted(params.items())) if params else 'restaurants:list:all'
+        key = versioned_key('restaurants:list', request.query_params.dict())
         cached = cache.get(key)
         if cached is not None:
             return Response(cached)
 
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        cache.set(key, serializer.data, timeout=60 * 5) 
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        cache.set(key, response.data, timeout=60 * 60)
+        return response
     
     def retrieve(self, request, *args, **kwargs):
         """GET /api/restaurants/<id>/ - детали ресторана"""
         instance = self.get_object()
-        key = f'restaurant:detail:{instance.id}'
+        key = versioned_key(f'restaurant:{instance.id}')
         cached = cache.get(key)
         if cached is not None:
             return Response(cached)
 
         serializer = self.get_serializer(instance)
-        cache.set(key, serializer.data, timeout=60 * 10)  
+        cache.set(key, serializer.data, timeout=60 * 60)
         return Response(serializer.data)
     
     def create(self, request, *args, **kwargs):
@@ -98,7 +113,7 @@ class RestaurantViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(owner=request.user)
-        cache.delete('restaurants:list:all')
+        bump_generation('restaurants:list', 'autocomplete')
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
@@ -108,9 +123,7 @@ class RestaurantViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        instance = self.get_object()
-        cache.delete(f'restaurant:detail:{instance.id}')
-        cache.delete('restaurants:list:all')
+        bump_generation('restaurants:list', f'restaurant:{instance.id}', 'autocomplete')
         return Response(serializer.data)
     
     def partial_update(self, request, *args, **kwargs):
@@ -120,36 +133,135 @@ class RestaurantViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        cache.delete(f'restaurant:detail:{instance.id}')
-        cache.delete('restaurants:list:all')
+        bump_generation('restaurants:list', f'restaurant:{instance.id}', 'autocomplete')
         return Response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
         """DELETE /api/restaurants/<id>/ - удаление ресторана"""
         instance = self.get_object()
         self.check_object_permissions(request, instance)
+        restaurant_id = instance.id
         instance.delete()
-        cache.delete('restaurants:list:all')
-        cache.delete(f'restaurant:detail:{instance.id}')
+        bump_generation('restaurants:list', f'restaurant:{restaurant_id}', 'autocomplete')
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def search(self, request):
         """
-        GET /api/restaurants/search/?q=query - поиск ресторанов
+        GET /api/restaurants/search/?q=query - полнотекстовый поиск ресторанов
         """
-        query = request.query_params.get('q', '')
+        paginator = PageNumberPagination()
+        query = request.query_params.get('q', '').strip()
         if not query:
-            return Response([], status=status.HTTP_200_OK)
+            paginator.paginate_queryset(Restaurant.objects.none(), request, view=self)
+            return paginator.get_paginated_response([])
         
+        search_query = (
+            SearchQuery(query, config='russian', search_type='websearch')
+            | SearchQuery(query, config='english', search_type='websearch')
+        )
         queryset = Restaurant.objects.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(address__icontains=query)
-        ).select_related('owner')
+            search_vector=search_query
+        ).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', 'id')
+        
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def autocomplete(self, request):
+        """
+        GET /api/restaurants/autocomplete/?q=пуш - подсказки по названиям ресторанов и блюд
+        """
+        params = AutocompleteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data['q'].lower()
+        limit = params.validated_data['limit']
+        
+        key = versioned_key('autocomplete', {'q': query, 'limit': limit})
+        cached = cache.get(key)
+        if cached is not None:
+            return Response(cached)
+        
+        # trigram_word_similar (%>) is served by the gin_trgm_ops indexes and
+        # matches both prefixes and misspelled words.
+        restaurants = Restaurant.objects.filter(
+            is_active=True,
+            name__trigram_word_similar=query
+        ).annotate(
+            similarity=TrigramWordSimilarity(query, 'name')
+        ).order_by('-similarity', 'name').values('id', 'name', 'similarity')[:limit]
+        
+        dishes = Dish.objects.filter(
+            is_available=True,
+            restaurant__is_active=True,
+            name__trigram_word_similar=query
+        ).annotate(
+            similarity=TrigramWordSimilarity(query, 'name')
+        ).order_by('-similarity', 'name').values('id', 'name', 'restaurant_id', 'similarity')[:limit]
+        
+        suggestions = [
+            {'type': 'restaurant', **row} for row in restaurants
+        ] + [
+            {'type': 'dish', **row} for row in dishes
+        ]
+        suggestions.sort(key=lambda item: -item['similarity'])
+        for item in suggestions:
+            del item['similarity']
+        
+        data = {'query': query, 'suggestions': suggestions[:limit]}
+        cache.set(key, data, timeout=60 * 60)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def nearby(self, request):
+        """
+        GET /api/restaurants/nearby/?lat=55.75&lng=37.61&radius=5 - рестораны рядом
+        """
+        params = NearbySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        lat = params.validated_data['lat']
+        lng = params.validated_data['lng']
+        
+        queryset = nearby(
+            self.get_queryset().filter(is_active=True),
+            lat, lng, params.validated_data['radius']
+        )[:params.validated_data['limit']]
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response({
+            'lat': lat,
+            'lng': lng,
+            'results': serializer.data
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def availability(self, request):
+        """
+        GET /api/restaurants/availability/?city=Москва&date=2024-01-15&time=19:00&party=4&cuisine=
+        - рестораны города со свободным столиком, по рейтингу
+        """
+        params = AvailabilitySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        
+        queryset = Restaurant.objects.filter(city=params.validated_data['city'])
+        cuisine = params.validated_data.get('cuisine')
+        if cuisine:
+            queryset = queryset.filter(cuisine_type=cuisine)
+        
+        queryset = restaurants_with_free_tables(
+            queryset,
+            params.validated_data['date'],
+            params.validated_data['time'],
+            params.validated_data['party']
+        )
+        
+        paginator = RatingPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = RestaurantAvailabilitySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_restaurants(self, request):
@@ -163,17 +275,67 @@ class RestaurantViewSet(viewsets.GenericViewSet):
         serializer = RestaurantListSerializer(queryset, many=True)
         return Response(serializer.data)
     
-    @action(detail=True, methods=['post'], permission_classes=[permissions.AllowAny])
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def dashboard(self, request, pk=None):
+        """
+        GET /api/restaurants/<id>/dashboard/?date=2024-01-15 - сводка дня для владельца
+        """
+        restaurant = self.get_object()
+        user = request.user
+        
+        if not (restaurant.owner_id == user.id or user.is_admin_user):
+            return Response({
+                'error': 'Only restaurant owner or admin can view the dashboard.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = DashboardSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        return Response(get_dashboard(restaurant, serializer.validated_data['date']))
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def forecast(self, request, pk=None):
+        """
+        GET /api/restaurants/<id>/forecast/?date_from=&date_to= - прогноз числа гостей по дням и часам
+        """
+        restaurant = self.get_object()
+        user = request.user
+        
+        if not (restaurant.owner_id == user.id or user.is_admin_user):
+            return Response({
+                'error': 'Only restaurant owner or admin can view the forecast.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = ForecastSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        forecasts = DemandForecast.objects.filter(
+            restaurant=restaurant,
+            date__range=(serializer.validated_data['date_from'], serializer.validated_data['date_to'])
+        ).order_by('date', 'hour').values('date', 'hour', 'expected_covers')
+        
+        days = {}
+        for row in forecasts:
+            day = days.setdefault(row['date'], {'date': row['date'], 'expected_covers': 0, 'hours': []})
+            day['expected_covers'] = round(day['expected_covers'] + row['expected_covers'], 2)
+            day['hours'].append({'hour': row['hour'], 'expected_covers': row['expected_covers']})
+        
+        return Response({
+            'restaurant_id': restaurant.id,
+            'days': list(days.values())
+        })
+    
+    @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.AllowAny])
     def available_tables(self, request, pk=None):
         """
-        POST /api/restaurants/<id>/available-tables/ - проверка доступных столиков
-        Body: {"date": "2024-01-15", "start_time": "19:00", "end_time": "21:00", "party_size": 4}
+        GET/POST /api/restaurants/<id>/available-tables/ - проверка доступных столиков
+        Params: {"date": "2024-01-15", "time_slot": "19:00", "guests_count": 4}
         """
         restaurant = self.get_object()
         
         serializer = AvailableTablesSerializer(
-            data=request.data,
-            context={'restaurant_id': restaurant.id}
+            data=request.data if request.method == 'POST' else request.query_params,
+            context={'restaurant': restaurant}
         )
         serializer.is_valid(raise_exception=True)
         
@@ -181,7 +343,10 @@ class RestaurantViewSet(viewsets.GenericViewSet):
         
         return Response({
             'restaurant_id': restaurant.id,
-            'available_tables': TableMinimalSerializer(available_tables, many=True).data,
+            'date': serializer.validated_data['date'],
+            'time_slot': serializer.validated_data['time_slot'],
+            'guests_count': serializer.validated_data['guests_count'],
+            'available_tables': available_tables,
             'count': len(available_tables)
         }, status=status.HTTP_200_OK)
 
@@ -189,6 +354,7 @@ class RestaurantViewSet(viewsets.GenericViewSet):
 class TableViewSet(viewsets.GenericViewSet):
     queryset = Table.objects.all()
     serializer_class = TableSerializer
+    pagination_class = TablePagination
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -211,9 +377,9 @@ class TableViewSet(viewsets.GenericViewSet):
     
     def list(self, request, *args, **kwargs):
         """GET /api/tables/ - список столиков"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     def retrieve(self, request, *args, **kwargs):
         """GET /api/tables/<id>/ - детали столика"""
@@ -240,6 +406,7 @@ class TableViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_generation(f'restaurant:{restaurant.id}', tables_family(restaurant.id))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
@@ -249,6 +416,7 @@ class TableViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_generation(f'restaurant:{instance.restaurant_id}', tables_family(instance.restaurant_id))
         return Response(serializer.data)
     
     def partial_update(self, request, *args, **kwargs):
@@ -258,6 +426,7 @@ class TableViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_generation(f'restaurant:{instance.restaurant_id}', tables_family(instance.restaurant_id))
         return Response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
@@ -265,12 +434,14 @@ class TableViewSet(viewsets.GenericViewSet):
         instance = self.get_object()
         self.check_object_permissions(request, instance)
         instance.delete()
+        bump_generation(f'restaurant:{instance.restaurant_id}', tables_family(instance.restaurant_id))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class DishViewSet(viewsets.GenericViewSet):
     queryset = Dish.objects.all()
     serializer_class = DishSerializer
+    pagination_class = DishPagination
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'search', 'restaurant_dishes']:
@@ -323,16 +494,14 @@ class DishViewSet(viewsets.GenericViewSet):
         if available is not None:
             queryset = queryset.filter(is_available=available.lower() == 'true')
         
-        ordering = self.request.query_params.get('ordering', 'name')
-        queryset = queryset.order_by(ordering)
-        
+        # ?ordering= is applied by DishPagination against its allowlist.
         return queryset
     
     def list(self, request, *args, **kwargs):
         """GET /api/dishes/ - список блюд"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     def retrieve(self, request, *args, **kwargs):
         """GET /api/dishes/<id>/ - детали блюда"""
@@ -358,6 +527,7 @@ class DishViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(data=request.data, context={'restaurant_id': restaurant_id})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_generation('autocomplete')
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
@@ -367,6 +537,7 @@ class DishViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_generation('autocomplete')
         return Response(serializer.data)
     
     def partial_update(self, request, *args, **kwargs):
@@ -376,6 +547,7 @@ class DishViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_generation('autocomplete')
         return Response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
@@ -383,6 +555,7 @@ class DishViewSet(viewsets.GenericViewSet):
         instance = self.get_object()
         self.check_object_permissions(request, instance)
         instance.delete()
+        bump_generation('autocomplete')
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Review
+from .models import Review, ReviewEligibility
 
 
 @admin.register(Review)
@@ -18,4 +18,16 @@ class ReviewAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    def delete_queryset(self, request, queryset):
+        # One by one, so each delete updates the rating and the review caches.
+        for review in queryset.select_related('restaurant'):
+            review.delete()
+
+
 
+@admin.register(ReviewEligibility)
+class ReviewEligibilityAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'restaurant', 'completed_reservations', 'review', 'updated_at']
+    search_fields = ['user__email', 'restaurant__name']
+    readonly_fields = ['user', 'restaurant', 'completed_reservations', 'review', 'updated_at']
@@ -0,0 +1,206 @@
+import json
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import LockError, RedisError
+
+from core.pagination import ReviewFeedPagination
+from .models import Review
+from .serializers import RestaurantReviewSerializer, ReviewListSerializer
+
+
+FEED_KEY = 'reviews:restaurant:{restaurant_id}:feed'
+FEED_TIMEOUT = 60 * 60 * 24
+
+LATEST_KEY = 'reviews:latest'
+LATEST_CITY_KEY = 'reviews:latest:city:{city}'
+LATEST_SIZE = 20
+# Kept beyond what is served so deletes do not leave the feed short.
+LATEST_KEPT = 100
+# Pushes do not extend it, so every list is rebuilt from the database at
+# least daily, dropping reviews removed behind the cache's back.
+LATEST_TIMEOUT = 60 * 60 * 24
+
+
+def review_feed(restaurant_id):
+    """Reviews of a restaurant, newest first, served by the review_restaurant_feed index."""
+    return Review.objects.filter(restaurant_id=restaurant_id).select_related('user')
+
+
+def _entry(review):
+    return {
+        'position': [review.created_at.isoformat(), review.id],
+        'data': RestaurantReviewSerializer(review).data,
+    }
+
+
+def get_first_page(restaurant_id):
+    """
+    The cached first feed page of a restaurant, built on a miss.
+
+    The page is stored as entries (keyset position plus serialized review)
+    and a ``has_next`` flag, so writes can patch it without a query.
+    """
+    key = FEED_KEY.format(restaurant_id=restaurant_id)
+    page = cache.get(key)
+    if page is None:
+        size = ReviewFeedPagination.page_size
+        rows = list(review_feed(restaurant_id).order_by(*ReviewFeedPagination.ordering)[:size + 1])
+        page = {
+            'entries': [_entry(review) for review in rows[:size]],
+            'has_next': len(rows) > size,
+        }
+        cache.set(key, page, timeout=FEED_TIMEOUT)
+    return page
+
+
+def _update_first_page(restaurant_id, change):
+    key = FEED_KEY.format(restaurant_id=restaurant_id)
+    try:
+        with cache.lock(f'{key}:lock', timeout=5, blocking_timeout=1):
+            page = cache.get(key)
+            if page is not None:
+                change(page)
+                cache.set(key, page, timeout=FEED_TIMEOUT)
+    except LockError:
+        # Could not patch the page safely; the next read rebuilds it.
+        cache.delete(key)
+
+
+def push_review(review):
+    """Write a new review through to the top of its restaurant's cached first page."""
+    def change(page):
+        # A miss after the review committed may have rebuilt the page with it.
+        if any(entry['position'][1] == review.id for entry in page['entries']):
+            return
+        page['entries'].insert(0, _entry(review))
+        if len(page['entries']) > ReviewFeedPagination.page_size:
+            page['entries'].pop()
+            page['has_next'] = True
+
+    _update_first_page(review.restaurant_id, change)
+
+
+def replace_review(review):
+    """Update an edited review in place if it is on the cached first page."""
+    def change(page):
+        for index, entry in enumerate(page['entries']):
+            if entry['position'][1] == review.id:
+                page['entries'][index] = _entry(review)
+
+    _update_first_page(review.restaurant_id, change)
+
+
+def drop_first_page(restaurant_id):
+    """A deleted review leaves a gap only the database can fill."""
+    cache.delete(FEED_KEY.format(restaurant_id=restaurant_id))
+
+
+def _latest_keys(city=None):
+    keys = [LATEST_KEY]
+    if city:
+        keys.append(LATEST_CITY_KEY.format(city=city))
+    return [cache.make_key(key) for key in keys]
+
+
+def _latest_entry(review):
+    data = dict(ReviewListSerializer(review).data)
+    data['restaurant_id'] = review.restaurant_id
+    return json.dumps(data)
+
+
+def _latest_from_db(city=None):
+    reviews = Review.objects.select_related('user', 'restaurant').order_by('-created_at', '-id')
+    if city:
+        reviews = reviews.filter(restaurant__city=city)
+    return [_latest_entry(review) for review in reviews[:LATEST_KEPT]]
+
+
+def latest_reviews(city=None):
+    """
+    Newest reviews overall or in ``city``, pre-serialized.
+
+    A warm list is answered by one LRANGE without touching the database;
+    a missing one is rebuilt from the database first. If Redis is down the
+    database answers directly, like the rest of the cache.
+    """
+    key = _latest_keys(city)[-1]
+    try:
+        connection = get_redis_connection('default')
+        entries = connection.lrange(key, 0, LATEST_SIZE - 1)
+        if not entries and not connection.exists(key):
+            entries = _latest_from_db(city)
+            if entries:
+                with connection.pipeline() as pipe:
+                    pipe.delete(key)
+                    pipe.rpush(key, *entries)
+                    pipe.expire(key, LATEST_TIMEOUT)
+                    pipe.execute()
+            entries = entries[:LATEST_SIZE]
+    except RedisError:
+        entries = _latest_from_db(city)[:LATEST_SIZE]
+    return [json.loads(entry) for entry in entries]
+
+
+def _listed(pipe, key, review_id):
+    return any(json.loads(entry)['id'] == review_id for entry in pipe.lrange(key, 0, -1))
+
+
+def push_latest(review):
+    """Put a new review on top of the global and city lists, capped at ``LATEST_KEPT``."""
+    entry = _latest_entry(review)
+
+    def push(pipe, key):
+        # Under WATCH: a rebuild from the database after the review committed
+        # already lists it, and must not get it a second time.
+        if _listed(pipe, key, review.id):
+            return
+        pipe.multi()
+        # LPUSHX: a list that is not built yet gets the review from the
+        # database when it is.
+        pipe.lpushx(key, entry)
+        pipe.ltrim(key, 0, LATEST_KEPT - 1)
+
+    try:
+        connection = get_redis_connection('default')
+        for key in _latest_keys(review.restaurant.city):
+            connection.transaction(lambda pipe: push(pipe, key), key)
+    except RedisError:
+        pass
+
+
+def _rewrite_latest(review_id, city, replacement=None):
+    def rewrite(pipe, key):
+        # Runs under WATCH: a push landing in between retries the rewrite
+        # instead of shifting the index under it.
+        for index, entry in enumerate(pipe.lrange(key, 0, -1)):
+            if json.loads(entry)['id'] == review_id:
+                pipe.multi()
+                if replacement is None:
+                    pipe.lrem(key, 1, entry)
+                else:
+                    pipe.lset(key, index, replacement)
+                return
+
+    try:
+        connection = get_redis_connection('default')
+        for key in _latest_keys(city):
+            connection.transaction(lambda pipe: rewrite(pipe, key), key)
+    except RedisError:
+        pass
+
+
+def update_latest(review):
+    """Refresh an edited review in the lists it appears in."""
+    _rewrite_latest(review.id, review.restaurant.city, _latest_entry(review))
+
+
+def prune_latest(review_id, city):
+    """Remove a deleted review from the lists it appears in."""
+    _rewrite_latest(review_id, city)
+
+
+def forget_review(restaurant_id, review_id, city):
+    """Take a deleted review out of its restaurant's first page and the latest lists."""
+    drop_first_page(restaurant_id)
+    prune_latest(review_id, city)
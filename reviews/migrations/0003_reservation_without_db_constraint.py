@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0006_waitlist"),
+        ("reviews", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="review",
+            name="reservation",
+            field=models.OneToOneField(
+                blank=True,
+                db_constraint=False,
+                help_text="Reservation this review is based on",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="review",
+                to="reservations.reservation",
+                verbose_name="reservation",
+            ),
+        ),
+    ]
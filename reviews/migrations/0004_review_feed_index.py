@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0007_partition_reservations"),
+        ("restaurants", "0010_rating_histogram"),
+        ("reviews", "0003_reservation_without_db_constraint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["restaurant", "-created_at", "-id"],
+                name="review_restaurant_feed",
+            ),
+        ),
+    ]
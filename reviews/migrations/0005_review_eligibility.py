@@ -0,0 +1,102 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_eligibility(apps, schema_editor):
+    # Archived reservations count too: eligibility outlives the hot table.
+    schema_editor.execute(
+        "INSERT INTO reviews_revieweligibility "
+        "(user_id, restaurant_id, completed_reservations, review_id, updated_at) "
+        "SELECT done.user_id, done.restaurant_id, count(*), "
+        "(SELECT min(v.id) FROM reviews_review AS v "
+        "WHERE v.user_id = done.user_id AND v.restaurant_id = done.restaurant_id), now() "
+        "FROM (SELECT user_id, restaurant_id FROM reservations_reservation WHERE status = 'completed' "
+        "UNION ALL SELECT user_id, restaurant_id FROM reservations_reservationarchive "
+        "WHERE status = 'completed') AS done "
+        "GROUP BY done.user_id, done.restaurant_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0010_rating_histogram"),
+        ("reservations", "0007_partition_reservations"),
+        ("reviews", "0004_review_feed_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReviewEligibility",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "completed_reservations",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of completed reservations of the guest here",
+                        verbose_name="completed reservations",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        help_text="Restaurant the guest has visited",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="review_eligibility",
+                        to="restaurants.restaurant",
+                        verbose_name="restaurant",
+                    ),
+                ),
+                (
+                    "review",
+                    models.OneToOneField(
+                        blank=True,
+                        help_text="Review the guest has written, if any",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="eligibility",
+                        to="reviews.review",
+                        verbose_name="review",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="Guest",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="review_eligibility",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "review eligibility",
+                "verbose_name_plural": "review eligibility",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="revieweligibility",
+            constraint=models.UniqueConstraint(
+                fields=("user", "restaurant"), name="review_eligibility_user_restaurant"
+            ),
+        ),
+        migrations.RunPython(populate_eligibility, migrations.RunPython.noop),
+    ]
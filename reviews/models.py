@@ -1,7 +1,21 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+
+NOT_ELIGIBLE_MESSAGE = 'You can only review restaurants where you have completed reservations'
+ALREADY_REVIEWED_MESSAGE = 'You have already reviewed this restaurant'
+
+
+def review_eligibility_error(eligibility, review_id=None):
+    """Why a user may not write (or keep) review ``review_id``, or None if they may."""
+    if eligibility is None or not eligibility.completed_reservations:
+        return NOT_ELIGIBLE_MESSAGE
+    if eligibility.review_id not in (None, review_id):
+        return ALREADY_REVIEWED_MESSAGE
+    return None
 
 
 class Review(models.Model):
@@ -19,9 +33,12 @@ class Review(models.Model):
         verbose_name='restaurant',
         help_text='Restaurant being reviewed'
     )
+    # No database constraint: reservations are partitioned by date and old
+    # ones are moved to the archive, keeping their ids.
     reservation = models.OneToOneField(
         'reservations.Reservation',
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='review',
         verbose_name='reservation',
         null=True,
@@ -51,44 +68,145 @@ class Review(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['rating']),
             models.Index(fields=['created_at']),
+            # Keyset feed of a restaurant's reviews, newest first.
+            models.Index(fields=['restaurant', '-created_at', '-id'], name='review_restaurant_feed'),
         ]
     
     def __str__(self):
         return f"{self.user.email} - {self.restaurant.name} - {self.rating}/5"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored rating, so an edit or delete can move the restaurant's
+        # totals by the difference.
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
+    
     def clean(self):
-        errors = {}
+        # A new review is checked once, by claiming its eligibility row in save().
+        if self.pk is None or self.user_id is None or self.restaurant_id is None:
+            return
         
-        if hasattr(self, 'user') and hasattr(self, 'restaurant'):
-            from reservations.models import ReservationStatus
-            
-            completed_reservations = self.user.reservations.filter(
-                restaurant=self.restaurant,
-                status=ReservationStatus.COMPLETED
-            )
-            
-            if not completed_reservations.exists():
-                errors['__all__'] = (
-                    'You can only review restaurants where you have completed reservations'
-                )
-        
-        if hasattr(self, 'user') and hasattr(self, 'restaurant'):
-            existing_review = Review.objects.filter(
-                user=self.user,
-                restaurant=self.restaurant
-            ).exclude(pk=self.pk)
-            
-            if existing_review.exists():
-                errors['__all__'] = 'You have already reviewed this restaurant'
-        
-        if errors:
-            raise ValidationError(errors)
+        error = review_eligibility_error(
+            ReviewEligibility.lookup(self.user_id, self.restaurant_id),
+            self.pk
+        )
+        if error:
+            raise ValidationError({'__all__': error})
     
     def save(self, *args, **kwargs):
+        from restaurants.models import Restaurant
+        
         self.full_clean()
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        loaded_rating = getattr(self, '_loaded_rating', None)
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                # Claiming the eligibility row is what makes the review the
+                # only one: of two concurrent submissions one finds it taken.
+                claimed = ReviewEligibility.objects.filter(
+                    user_id=self.user_id,
+                    restaurant_id=self.restaurant_id,
+                    completed_reservations__gt=0,
+                    review__isnull=True
+                ).update(review=self, updated_at=timezone.now())
+                if not claimed:
+                    error = review_eligibility_error(
+                        ReviewEligibility.lookup(self.user_id, self.restaurant_id)
+                    )
+                    raise ValidationError({'__all__': error or ALREADY_REVIEWED_MESSAGE})
+                Restaurant.apply_rating_change(self.restaurant_id, added=self.rating)
+            elif loaded_rating is not None and (update_fields is None or 'rating' in update_fields):
+                Restaurant.apply_rating_change(self.restaurant_id, removed=loaded_rating, added=self.rating)
         
-        if is_new or 'rating' in kwargs.get('update_fields', []):
-            self.restaurant.update_rating()
+        self._loaded_rating = self.rating
+    
+    def delete(self, *args, **kwargs):
+        from restaurants.models import Restaurant
+        
+        from .feed import forget_review
+        
+        # Bulk and cascading deletes skip this; the nightly rating repair
+        # reconciles them, and the review caches expire within a day.
+        restaurant_id, review_id, city = self.restaurant_id, self.pk, self.restaurant.city
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            rating = getattr(self, '_loaded_rating', None) or self.rating
+            Restaurant.apply_rating_change(self.restaurant_id, removed=rating)
+            transaction.on_commit(lambda: forget_review(restaurant_id, review_id, city))
+        return result
+
+
+class ReviewEligibility(models.Model):
+    """
+    Whether a user may review a restaurant, maintained on writes.
 
+    The row appears when one of the user's reservations there is completed
+    and points at their review once it is written (a deleted review frees
+    it again), so every eligibility check is one unique-index lookup
+    instead of queries over reservations and reviews.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='review_eligibility',
+        verbose_name='user',
+        help_text='Guest'
+    )
+    restaurant = models.ForeignKey(
+        'restaurants.Restaurant',
+        on_delete=models.CASCADE,
+        related_name='review_eligibility',
+        verbose_name='restaurant',
+        help_text='Restaurant the guest has visited'
+    )
+    completed_reservations = models.PositiveIntegerField(
+        'completed reservations',
+        default=0,
+        help_text='Number of completed reservations of the guest here'
+    )
+    review = models.OneToOneField(
+        Review,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='eligibility',
+        verbose_name='review',
+        help_text='Review the guest has written, if any'
+    )
+    updated_at = models.DateTimeField('updated at', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'review eligibility'
+        verbose_name_plural = 'review eligibility'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'restaurant'], name='review_eligibility_user_restaurant'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.restaurant_id}"
+    
+    @classmethod
+    def lookup(cls, user_id, restaurant_id):
+        return cls.objects.filter(user_id=user_id, restaurant_id=restaurant_id).first()
+    
+    @classmethod
+    def record_completed(cls, user_id, restaurant_id):
+        """Count a completed reservation; call it in the transaction that completes it."""
+        rows = cls.objects.filter(user_id=user_id, restaurant_id=restaurant_id)
+        increment = {
+            'completed_reservations': models.F('completed_reservations') + 1,
+            'updated_at': timezone.now(),
+        }
+        if rows.update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, restaurant_id=restaurant_id, completed_reservations=1)
+        except IntegrityError:
+            # A concurrent completion created the row first.
+            rows.update(**increment)
@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import Review
 from users.serializers import UserMinimalSerializer
@@ -32,25 +33,15 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         restaurant = attrs['restaurant']
         
-        completed_reservations = user.reservations.filter(
-            restaurant=restaurant,
-            status=ReservationStatus.COMPLETED
-        )
-        
-        if not completed_reservations.exists():
-            raise serializers.ValidationError({
-                'restaurant': 'You can only review restaurants where you have completed reservations'
-            })
-        
         if 'reservation' in attrs and attrs['reservation']:
             reservation = attrs['reservation']
             
-            if reservation.user != user:
+            if reservation.user_id != user.id:
                 raise serializers.ValidationError({
                     'reservation': 'This reservation does not belong to you'
                 })
             
-            if reservation.restaurant != restaurant:
+            if reservation.restaurant_id != restaurant.id:
                 raise serializers.ValidationError({
                     'reservation': 'This reservation is not for the selected restaurant'
                 })
@@ -65,21 +56,16 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
                     'reservation': 'You have already reviewed this reservation'
                 })
         
-        existing_review = Review.objects.filter(
-            user=user,
-            restaurant=restaurant
-        )
-        
-        if existing_review.exists():
-            raise serializers.ValidationError({
-                'restaurant': 'You have already reviewed this restaurant'
-            })
-        
         return attrs
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return Review.objects.create(**validated_data)
+        try:
+            return Review.objects.create(**validated_data)
+        except DjangoValidationError as exc:
+            # Eligibility is checked once, when Review.save claims it: no
+            # completed reservation, or already reviewed (perhaps concurrently).
+            raise serializers.ValidationError({'restaurant': exc.messages})
 
 
 class ReviewUpdateSerializer(serializers.ModelSerializer):    
@@ -125,3 +111,11 @@ class ReviewStatsSerializer(serializers.Serializer):
     three_star = serializers.IntegerField(required=False)
     two_star = serializers.IntegerField(required=False)
     one_star = serializers.IntegerField(required=False)
+
+
+class ReviewStatsQuerySerializer(serializers.Serializer):
+    restaurant = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=100
+    )
@@ -1,3 +1,77 @@
+from datetime import time
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from restaurants.models import Restaurant
+from users.models import User
+from .models import Review, ReviewEligibility
+
+
+class RatingDeltaTests(TestCase):
+    """Review writes move the restaurant's rating totals by their own difference."""
+
+    def setUp(self):
+        owner = User.objects.create_user(
+            'owner@example.com', 'password', first_name='Owner', last_name='Test'
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=owner, name='Test', description='Test', cuisine_type='russian',
+            phone='+79161234567', email='r@example.com', address='Test', city='Москва',
+            opening_time=time(10), closing_time=time(23)
+        )
+
+    def review(self, email, rating):
+        user = User.objects.create_user(email, 'password', first_name='Guest', last_name='Test')
+        ReviewEligibility.objects.create(user=user, restaurant=self.restaurant, completed_reservations=1)
+        return Review.objects.create(user=user, restaurant=self.restaurant, rating=rating, comment='Test')
+
+    def assertRating(self, total, rating_sum, average, counts):
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.total_reviews, total)
+        self.assertEqual(self.restaurant.rating_sum, rating_sum)
+        self.assertEqual(self.restaurant.average_rating, Decimal(average))
+        self.assertEqual(
+            [getattr(self.restaurant, f'rating_count_{rating}') for rating in range(1, 6)],
+            counts
+        )
+
+    def test_create_adds_the_rating(self):
+        self.review('a@example.com', 5)
+        self.review('b@example.com', 4)
+
+        self.assertRating(2, 9, '4.50', [0, 0, 0, 1, 1])
+
+    def test_edit_moves_the_rating(self):
+        review = self.review('a@example.com', 5)
+        self.review('b@example.com', 4)
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 2
+        review.save()
+
+        self.assertRating(2, 6, '3.00', [0, 1, 0, 1, 0])
+
+    def test_edit_without_rating_leaves_totals(self):
+        review = self.review('a@example.com', 5)
+
+        review = Review.objects.get(pk=review.pk)
+        review.comment = 'Edited'
+        review.save(update_fields=['comment', 'updated_at'])
+
+        self.assertRating(1, 5, '5.00', [0, 0, 0, 0, 1])
+
+    def test_delete_removes_the_rating(self):
+        review = self.review('a@example.com', 5)
+        self.review('b@example.com', 3)
+
+        Review.objects.get(pk=review.pk).delete()
+
+        self.assertRating(1, 3, '3.00', [0, 0, 1, 0, 0])
+
+    def test_deleting_the_last_review_resets_the_average(self):
+        review = self.review('a@example.com', 4)
+
+        Review.objects.get(pk=review.pk).delete()
+
+        self.assertRating(0, 0, '0', [0, 0, 0, 0, 0])
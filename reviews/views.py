@@ -1,19 +1,24 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg, Count
 from django.core.cache import cache
-from django.utils.http import urlencode
 
-from .models import Review
+from .feed import (
+    get_first_page, latest_reviews, push_latest, push_review, replace_review,
+    review_feed, update_latest
+)
+from .models import Review, ReviewEligibility
 from .serializers import (
     ReviewSerializer,
     ReviewCreateSerializer,
     ReviewUpdateSerializer,
     ReviewListSerializer,
     RestaurantReviewSerializer,
+    ReviewStatsQuerySerializer,
 )
-from reservations.models import Reservation, ReservationStatus
+from restaurants.models import Restaurant, RATING_STATS_FIELDS
+from core.cache import versioned_key, bump_generation
+from core.pagination import ReviewFeedPagination
 from core.permissions import IsReviewAuthorOrReadOnly
 
 
@@ -22,7 +27,7 @@ class ReviewViewSet(viewsets.GenericViewSet):
     serializer_class = ReviewSerializer
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'latest']:
+        if self.action in ['list', 'retrieve', 'latest', 'restaurant_reviews', 'restaurant_stats', 'stats']:
             return [permissions.AllowAny()]
         elif self.action == 'create':
             return [permissions.IsAuthenticated()]
@@ -57,29 +62,39 @@ class ReviewViewSet(viewsets.GenericViewSet):
         
         return queryset
     
+    def _invalidate(self, restaurant_id, review_id=None):
+        # Ratings feed the restaurant list and detail, so those go too.
+        families = [
+            'reviews:list',
+            'restaurants:list',
+            f'restaurant:{restaurant_id}',
+        ]
+        if review_id is not None:
+            families.append(f'review:{review_id}')
+        bump_generation(*families)
+    
     def list(self, request, *args, **kwargs):
         """GET /api/reviews/ - список отзывов"""
-        params = request.query_params.dict()
-        key = 'reviews:list:' + urlencode(sorted(params.items())) if params else 'reviews:list:all'
+        key = versioned_key('reviews:list', request.query_params.dict())
         cached = cache.get(key)
         if cached is not None:
             return Response(cached)
 
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
-        cache.set(key, serializer.data, timeout=60 * 3) 
+        cache.set(key, serializer.data, timeout=60 * 30)
         return Response(serializer.data)
     
     def retrieve(self, request, *args, **kwargs):
         """GET /api/reviews/<id>/ - детали отзыва"""
         instance = self.get_object()
-        key = f'review:detail:{instance.id}'
+        key = versioned_key(f'review:{instance.id}')
         cached = cache.get(key)
         if cached is not None:
             return Response(cached)
 
         serializer = self.get_serializer(instance)
-        cache.set(key, serializer.data, timeout=60 * 5)
+        cache.set(key, serializer.data, timeout=60 * 60)
         return Response(serializer.data)
     
     def create(self, request, *args, **kwargs):
@@ -87,9 +102,9 @@ class ReviewViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         review = serializer.save(user=request.user)
-        cache.delete('reviews:list:all')
-        cache.delete(f'reviews:restaurant:{review.restaurant_id}:stats')
-        cache.delete(f'restaurant:detail:{review.restaurant_id}')
+        self._invalidate(review.restaurant_id)
+        push_review(review)
+        push_latest(review)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
@@ -99,10 +114,9 @@ class ReviewViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        cache.delete(f'review:detail:{instance.id}')
-        cache.delete('reviews:list:all')
-        cache.delete(f'reviews:restaurant:{instance.restaurant_id}:stats')
-        cache.delete(f'restaurant:detail:{instance.restaurant_id}')
+        self._invalidate(instance.restaurant_id, instance.id)
+        replace_review(instance)
+        update_latest(instance)
         return Response(serializer.data)
     
     def partial_update(self, request, *args, **kwargs):
@@ -112,10 +126,9 @@ class ReviewViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        cache.delete(f'review:detail:{instance.id}')
-        cache.delete('reviews:list:all')
-        cache.delete(f'reviews:restaurant:{instance.restaurant_id}:stats')
-        cache.delete(f'restaurant:detail:{instance.restaurant_id}')
+        self._invalidate(instance.restaurant_id, instance.id)
+        replace_review(instance)
+        update_latest(instance)
         return Response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
@@ -125,10 +138,7 @@ class ReviewViewSet(viewsets.GenericViewSet):
         restaurant_id = instance.restaurant_id
         review_id = instance.id
         instance.delete()
-        cache.delete(f'review:detail:{review_id}')
-        cache.delete('reviews:list:all')
-        cache.delete(f'reviews:restaurant:{restaurant_id}:stats')
-        cache.delete(f'restaurant:detail:{restaurant_id}')
+        self._invalidate(restaurant_id, review_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=False, methods=['get'])
@@ -146,27 +156,26 @@ class ReviewViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def latest(self, request):
         """
-        GET /api/reviews/latest/ - последние отзывы
+        GET /api/reviews/latest/?city=Москва - последние отзывы (по всем ресторанам или по городу)
         """
-        queryset = Review.objects.select_related(
-            'user', 'restaurant'
-        ).order_by('-created_at')[:20]
-        
-        serializer = ReviewListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(latest_reviews(request.query_params.get('city') or None))
     
-    @action(detail=False, methods=['get'], url_path='restaurant/(?P<restaurant_id>[^/.]+)', 
+    @action(detail=False, methods=['get'], url_path='restaurant/(?P<restaurant_id>[0-9]+)', 
             permission_classes=[permissions.AllowAny])
     def restaurant_reviews(self, request, restaurant_id=None):
         """
-        GET /api/reviews/restaurant/<restaurant_id>/ - отзывы ресторана
+        GET /api/reviews/restaurant/<restaurant_id>/ - отзывы ресторана (курсорная пагинация)
         """
-        queryset = Review.objects.filter(
-            restaurant_id=restaurant_id
-        ).select_related('user').order_by('-created_at')
+        paginator = ReviewFeedPagination()
+        if paginator.is_first_page(request):
+            # The first page is the hot one: served from a cache that review
+            # writes keep current.
+            results = paginator.paginate_cached(request, get_first_page(restaurant_id))
+            return paginator.get_paginated_response(results)
         
-        serializer = RestaurantReviewSerializer(queryset, many=True)
-        return Response(serializer.data)
+        page = paginator.paginate_queryset(review_feed(restaurant_id), request, view=self)
+        serializer = RestaurantReviewSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'], url_path='restaurant/(?P<restaurant_id>[^/.]+)/stats',
             permission_classes=[permissions.AllowAny])
@@ -174,80 +183,49 @@ class ReviewViewSet(viewsets.GenericViewSet):
         """
         GET /api/reviews/restaurant/<restaurant_id>/stats/ - статистика отзывов
         """
-        key = f'reviews:restaurant:{restaurant_id}:stats'
-        cached = cache.get(key)
-        if cached is not None:
-            return Response(cached)
-
-        reviews = Review.objects.filter(restaurant_id=restaurant_id)
-        
-        if not reviews.exists():
-            data = {
-                'restaurant_id': restaurant_id,
-                'total_reviews': 0,
-                'average_rating': 0,
-                'rating_distribution': {
-                    '5': 0, '4': 0, '3': 0, '2': 0, '1': 0
-                }
-            }
-            cache.set(key, data, timeout=60 * 10)
-            return Response(data, status=status.HTTP_200_OK)
-        
-        stats = reviews.aggregate(
-            total=Count('id'),
-            average=Avg('rating')
-        )
+        restaurant = Restaurant.objects.only(*RATING_STATS_FIELDS).filter(pk=restaurant_id).first()
+        if restaurant is None:
+            return Response({
+                'error': 'Restaurant not found.'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        distribution = {
-            '5': reviews.filter(rating=5).count(),
-            '4': reviews.filter(rating=4).count(),
-            '3': reviews.filter(rating=3).count(),
-            '2': reviews.filter(rating=2).count(),
-            '1': reviews.filter(rating=1).count(),
-        }
+        return Response(restaurant.rating_stats(), status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def stats(self, request):
+        """
+        GET /api/reviews/stats/?restaurant=1&restaurant=2 - статистика отзывов нескольких ресторанов
+        """
+        serializer = ReviewStatsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
         
-        data = {
-            'restaurant_id': restaurant_id,
-            'total_reviews': stats['total'],
-            'average_rating': round(stats['average'], 2) if stats['average'] else 0,
-            'rating_distribution': distribution
-        }
-        cache.set(key, data, timeout=60 * 10)
-        return Response(data, status=status.HTTP_200_OK)
-    
-    @action(detail=False, methods=['get'], url_path='restaurant/(?P<restaurant_id>[^/.]+)/can-review',
+        restaurants = Restaurant.objects.only(*RATING_STATS_FIELDS).filter(
+            pk__in=serializer.validated_data['restaurant']
+        ).order_by('pk')
+        return Response([restaurant.rating_stats() for restaurant in restaurants])
+    
+    @action(detail=False, methods=['get'], url_path='restaurant/(?P<restaurant_id>[0-9]+)/can-review',
             permission_classes=[permissions.IsAuthenticated])
     def can_review(self, request, restaurant_id=None):
         """
         GET /api/reviews/restaurant/<restaurant_id>/can-review/ - проверка возможности оставить отзыв
         """
-        user = request.user
+        eligibility = ReviewEligibility.lookup(request.user.id, restaurant_id)
         
-        completed_reservations = Reservation.objects.filter(
-            user=user,
-            restaurant_id=restaurant_id,
-            status=ReservationStatus.COMPLETED
-        )
-        
-        if not completed_reservations.exists():
+        if eligibility is None or not eligibility.completed_reservations:
             return Response({
                 'can_review': False,
                 'reason': 'You need to have a completed reservation to leave a review.'
             }, status=status.HTTP_200_OK)
         
-        existing_review = Review.objects.filter(
-            user=user,
-            restaurant_id=restaurant_id
-        ).first()
-        
-        if existing_review:
+        if eligibility.review_id:
             return Response({
                 'can_review': False,
                 'reason': 'You have already reviewed this restaurant.',
-                'review_id': existing_review.id
+                'review_id': eligibility.review_id
             }, status=status.HTTP_200_OK)
         
         return Response({
             'can_review': True,
-            'completed_reservations': completed_reservations.count()
+            'completed_reservations': eligibility.completed_reservations
         }, status=status.HTTP_200_OK)
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 
+from core.pagination import UserPagination
 from .serializers import (
     UserRegistrationSerializer,
     UserSerializer,
@@ -17,6 +18,7 @@ User = get_user_model()
 class UserViewSet(viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = UserPagination
     
     def get_permissions(self):
         if self.action in ['create', 'register']:
@@ -46,15 +48,15 @@ class UserViewSet(viewsets.GenericViewSet):
             if is_active is not None:
                 queryset = queryset.filter(is_active=is_active.lower() == 'true')
             
-            return queryset.order_by('-date_joined')
+            return queryset.order_by('-created_at')
         
         return queryset
     
     def list(self, request, *args, **kwargs):
         """GET /api/users/ - список пользователей (только admin)"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     def retrieve(self, request, *args, **kwargs):
         """GET /api/users/<id>/ - детали пользователя"""